@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quiz.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,22 +81,114 @@ NPM_BIN_PATH = r"C:\Program Files\nodejs\npm.cmd"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'quiz.authentication.CachedJWTAuthentication',
     )
 }
+
+# With QUIZ_JWT_CHECK_REVOKE=1, tokens carry a hash of the user's password,
+# so changing it revokes them; quiz.authentication also uses it as the
+# version of cached users. Tokens issued before it was enabled lack the
+# hash and are rejected, so turning it on logs every API client out once.
+SIMPLE_JWT = {
+    'CHECK_REVOKE_TOKEN': os.environ.get('QUIZ_JWT_CHECK_REVOKE') == '1',
+}
+# Seconds an authenticated API user is reused without reloading its row.
+QUIZ_AUTH_CACHE_TTL = 30
 WSGI_APPLICATION = 'QuizEvent.wsgi.application'
 
+# 'sync' grades submissions inside the request; 'queued' answers 202 with a
+# ticket and leaves grading to `manage.py process_submissions` workers.
+QUIZ_SUBMISSION_MODE = 'sync'
+
+# 'deferred' has the admin only hide a quiz and leaves its rows to a
+# `manage.py delete_quizzes --watch` worker; 'sync' deletes them in chunks
+# within the admin request, right after its transaction commits.
+QUIZ_DELETION_MODE = 'deferred'
+
+# Quiz leaderboards are kept in memory per process; `manage.py rebuild_leaderboards`
+# writes snapshots here so new processes can start without a full reload.
+LEADERBOARD_SNAPSHOT_DIR = BASE_DIR / 'var' / 'leaderboards'
+LEADERBOARD_MAX_AGE = 600
+# Submission ids below the watermark re-checked on each catch-up, for rows
+# that committed after one with a higher id.
+LEADERBOARD_RESCAN_WINDOW = 1000
+
+# Request instrumentation (quiz.middleware.RequestMetricsMiddleware): requests
+# slower than this are logged with their slowest queries, and /metrics is only
+# served to these addresses or to staff users.
+SLOW_REQUEST_THRESHOLD_MS = 500
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# QUIZ_DB_PROFILE selects the database:
+# - 'sqlite' (default): WAL journal, a busy timeout and synchronous=NORMAL on
+#   every connection, and IMMEDIATE transactions so writers queue on the lock
+#   instead of failing with "database is locked" when upgrading a read lock.
+#   The journal mode is stored in the database file itself, so quiz.signals
+#   sets it on connect for every database but the sample db.sqlite3 kept in
+#   git; point QUIZ_SQLITE_PATH at another file to run the live site in WAL.
+# - 'sqlite-basic': SQLite with the driver defaults, kept as a load-test baseline.
+# - 'postgres': PostgreSQL configured from the POSTGRES_* variables, with
+#   persistent, health-checked connections, or a psycopg connection pool when
+#   QUIZ_DB_POOL_SIZE is set (requires `psycopg[pool]`).
+DB_PROFILE = os.environ.get('QUIZ_DB_PROFILE', 'sqlite')
+
+SAMPLE_SQLITE_PATH = BASE_DIR / 'db.sqlite3'
+
+SQLITE_DATABASE = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': Path(os.environ.get('QUIZ_SQLITE_PATH', SAMPLE_SQLITE_PATH)),
+    # A file-backed test database lets concurrent test threads wait on
+    # SQLite's busy timeout instead of failing on shared-cache locks.
+    'TEST': {
+        'NAME': BASE_DIR / 'test_db.sqlite3',
+    },
+}
+
+if DB_PROFILE == 'sqlite':
+    default_database = dict(SQLITE_DATABASE, OPTIONS={
+        'init_command': 'PRAGMA synchronous=NORMAL; PRAGMA busy_timeout=20000;',
+        'transaction_mode': 'IMMEDIATE',
+    })
+elif DB_PROFILE == 'sqlite-basic':
+    default_database = SQLITE_DATABASE
+elif DB_PROFILE == 'postgres':
+    default_database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'quizevent'),
+        'USER': os.environ.get('POSTGRES_USER', 'quizevent'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
     }
+    pool_size = int(os.environ.get('QUIZ_DB_POOL_SIZE', 0))
+    if pool_size:
+        from psycopg_pool import ConnectionPool
+
+        # Pooled connections are checked before being handed out, and the
+        # pool (not CONN_MAX_AGE) decides how long they live.
+        default_database['OPTIONS'] = {'pool': {
+            'min_size': 2,
+            'max_size': pool_size,
+            'timeout': 10,
+            'check': ConnectionPool.check_connection,
+        }}
+    else:
+        default_database['CONN_MAX_AGE'] = 600
+        default_database['CONN_HEALTH_CHECKS'] = True
+else:
+    raise ValueError(f"Unknown QUIZ_DB_PROFILE {DB_PROFILE!r}")
+
+DATABASES = {
+    'default': default_database,
 }
 
+QUIZ_SQLITE_WAL = DB_PROFILE == 'sqlite'
+QUIZ_SQLITE_WAL_EXCLUDE = [SAMPLE_SQLITE_PATH]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
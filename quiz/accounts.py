@@ -0,0 +1,46 @@
+"""
+Account creation backed by the case-insensitive unique indexes on
+``lower(username)`` and ``lower(email)`` (migration 0010).
+
+Registration does not look for an existing account first: the INSERT is the
+check, and only when it fails is one indexed lookup made to tell which field
+collided.
+"""
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+USERNAME_TAKEN = "A user with this username already exists."
+EMAIL_TAKEN = "A user with this email already exists."
+
+
+class DuplicateAccount(Exception):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+def username_taken(username, exclude=None):
+    # Filter on the indexed expression itself; ``__iexact`` compiles to
+    # LIKE or UPPER(), which the lower() index cannot serve.
+    users = User.objects.alias(username_lower=Lower('username')).filter(username_lower=username.lower())
+    if exclude is not None:
+        users = users.exclude(pk=exclude)
+    return users.exists()
+
+
+def duplicate_account(username, exclude=None):
+    """The ``DuplicateAccount`` for a write of ``username`` that hit one of the unique indexes."""
+    if username_taken(username, exclude):
+        return DuplicateAccount('username', USERNAME_TAKEN)
+    return DuplicateAccount('email', EMAIL_TAKEN)
+
+
+def create_account(username, email, password):
+    """Create a user, raising ``DuplicateAccount`` if the username or email is taken in any case."""
+    try:
+        with transaction.atomic():
+            return User.objects.create_user(username=username, email=email, password=password)
+    except IntegrityError:
+        raise duplicate_account(username)
@@ -1,32 +1,156 @@
-from django.contrib import admin
-from .models import Quiz, Question, Answer, UserSubmission, UserAnswer, Event
+from functools import partial
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth import get_permission_codename
+from django.db import transaction
+from django.db.models import Sum
+from .analytics import refresh_analytics
+from .deletion import STEPS, delete_quiz, hide_quizzes
+from .models import (
+    Quiz, Question, Answer, UserSubmission, UserAnswer, Event, QueuedSubmission, QuestionStats, AnswerStats,
+)
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow with every submission: counts are
+    estimated when unfiltered, and the unfiltered total is not counted again
+    beside a filtered one. Subclasses select the related rows their columns show.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'created_at')
+    search_fields = ('title',)
+    date_hierarchy = 'created_at'
+    actions = ['rebuild_analytics']
+
+    @admin.action(description="Rebuild item analytics")
+    def rebuild_analytics(self, request, queryset):
+        for quiz_id in queryset.values_list('id', flat=True):
+            refresh_analytics(quiz_id, rebuild=True)
+
+    def get_deleted_objects(self, objs, request):
+        # The default walks every dependent row to list it on the confirmation
+        # page; summarize from the quiz counters instead.
+        quiz_ids = [quiz.pk for quiz in objs]
+        totals = Quiz.objects.filter(pk__in=quiz_ids).aggregate(
+            questions=Sum('question_count'), submissions=Sum('submission_count'),
+        )
+        model_count = {
+            Quiz._meta.verbose_name_plural: len(quiz_ids),
+            Question._meta.verbose_name_plural: totals['questions'] or 0,
+            UserSubmission._meta.verbose_name_plural: totals['submissions'] or 0,
+        }
+        perms_needed = {
+            model._meta.verbose_name
+            for model, _ in STEPS
+            if not request.user.has_perm(
+                f"{model._meta.app_label}.{get_permission_codename('delete', model._meta)}"
+            )
+        }
+        return [str(quiz) for quiz in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_quizzes(request, [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.delete_quizzes(request, list(queryset.values_list('pk', flat=True)))
+
+    def delete_quizzes(self, request, quiz_ids):
+        # Only the hiding happens in the request. Deleting the rows of a big
+        # quiz takes minutes, which is left to `delete_quizzes --watch`.
+        hide_quizzes(quiz_ids)
+        if getattr(settings, 'QUIZ_DELETION_MODE', 'deferred') == 'sync':
+            # The delete view runs inside a transaction; the chunks each commit
+            # on their own once it has committed.
+            transaction.on_commit(partial(self.delete_hidden, request, quiz_ids))
+        else:
+            self.message_user(
+                request,
+                f"{len(quiz_ids)} quiz(zes) hidden from the site. Their rows are being deleted in the background.",
+                messages.WARNING,
+            )
+
+    def delete_hidden(self, request, quiz_ids):
+        rows = 0
+        for quiz_id in quiz_ids:
+            rows += sum(delete_quiz(quiz_id).values())
+        self.message_user(request, f"Deleted {rows} rows in chunks.")
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(LargeTableAdmin):
     list_display = ('id', 'quiz', 'text', 'question_type', 'created_at')
+    list_select_related = ('quiz',)
+    search_fields = ('text',)
+    autocomplete_fields = ('quiz',)
 
 
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
+class AnswerAdmin(LargeTableAdmin):
     list_display = ('id', 'question', 'text', 'is_correct')
+    # Question.__str__ shows its quiz's title.
+    list_select_related = ('question__quiz',)
+    autocomplete_fields = ('question',)
 
 
 @admin.register(UserSubmission)
-class UserSubmissionAdmin(admin.ModelAdmin):
+class UserSubmissionAdmin(LargeTableAdmin):
     list_display = ('id', 'user_name', 'quiz', 'score', 'submitted_at')
+    list_select_related = ('user_name', 'quiz')
+    date_hierarchy = 'submitted_at'
+    autocomplete_fields = ('user_name', 'quiz')
 
 
 @admin.register(UserAnswer)
-class UserAnswerAdmin(admin.ModelAdmin):
+class UserAnswerAdmin(LargeTableAdmin):
     list_display = ('id', 'submission', 'question', 'answer', 'is_correct')
+    list_select_related = ('submission__user_name', 'submission__quiz', 'question__quiz', 'answer')
+    raw_id_fields = ('submission', 'answer')
+    autocomplete_fields = ('question',)
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'date', 'location')
+    date_hierarchy = 'date'
+
+
+@admin.register(QueuedSubmission)
+class QueuedSubmissionAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'quiz', 'status', 'created_at', 'processed_at')
+    list_select_related = ('user', 'quiz')
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    raw_id_fields = ('submission',)
+    autocomplete_fields = ('user', 'quiz')
+
+
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(admin.ModelAdmin):
+    """Read-only; refreshed through the quiz analytics API and ``rebuild_item_analytics``."""
+    list_display = ('question', 'quiz', 'attempts', 'percent_correct', 'discrimination')
+    list_select_related = ('question__quiz', 'quiz')
+    list_filter = ('quiz',)
+    fields = ('question', 'quiz', 'attempts', 'correct', 'percent_correct', 'discrimination', 'answer_picks')
+    readonly_fields = ('percent_correct', 'discrimination', 'answer_picks')
+
+    @admin.display(description="Answer picks")
+    def answer_picks(self, obj):
+        picks = dict(AnswerStats.objects.filter(question_id=obj.question_id).values_list('answer_id', 'picks'))
+        return ", ".join(
+            f"{answer.text}{' (correct)' if answer.is_correct else ''}: {picks.get(answer.id, 0)}"
+            for answer in obj.question.answers.order_by('id')
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
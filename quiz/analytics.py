@@ -0,0 +1,146 @@
+"""
+Per-question item analytics.
+
+``QuestionStats`` and ``AnswerStats`` hold running sums over ``UserAnswer``
+rows. Each refresh claims the quiz's pending submissions, those whose
+``analytics_batch`` is still NULL, by stamping them with a new batch number,
+and folds that batch in with one aggregate query grouped by (question,
+answer). A submission is pending until a refresh has counted it, whatever
+order submissions commit in. A rebuild claims every submission of the quiz.
+Editing or deleting a submission drops the quiz's ``QuizAnalytics`` row, so
+the next refresh rebuilds.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Answer, AnswerStats, Question, QuestionStats, QuizAnalytics, UserAnswer, UserSubmission
+
+QUESTION_SUMS = ('attempts', 'correct', 'score_sum', 'score_squares', 'correct_score_sum')
+
+
+def aggregate_answers(quiz_id, batch):
+    score = F('submission__score')
+    return (
+        UserAnswer.objects.filter(submission__quiz_id=quiz_id, submission__analytics_batch=batch)
+        .values('question_id', 'answer_id')
+        .annotate(
+            attempts=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+            score_sum=Sum(score),
+            score_squares=Sum(score * score),
+            correct_score_sum=Sum(score, filter=Q(is_correct=True)),
+            last_submission=Max('submission_id'),
+        )
+        .order_by()
+    )
+
+
+def merge(model, existing, deltas, fields, defaults):
+    """Add ``deltas`` (pk -> field values) to the ``existing`` rows; missing rows are created from ``defaults``."""
+    changed, created = [], []
+    for pk, values in deltas.items():
+        row = existing.get(pk)
+        if row is None:
+            created.append(model(pk=pk, **defaults[pk], **dict(zip(fields, values))))
+            continue
+        for field, value in zip(fields, values):
+            setattr(row, field, getattr(row, field) + value)
+        changed.append(row)
+    model.objects.bulk_update(changed, fields)
+    model.objects.bulk_create(created)
+
+
+def refresh_analytics(quiz_id, rebuild=False):
+    """Bring the item statistics of a quiz up to date; returns its ``QuizAnalytics`` row."""
+    with transaction.atomic():
+        state, created = QuizAnalytics.objects.select_for_update().get_or_create(quiz_id=quiz_id)
+        rebuild = rebuild or created
+        batch = state.batch + 1
+
+        # The UPDATE claims exactly the rows the aggregate below reads; a
+        # submission committed meanwhile stays NULL for the next refresh.
+        claimed = UserSubmission.objects.filter(quiz_id=quiz_id)
+        if not rebuild:
+            claimed = claimed.filter(analytics_batch__isnull=True)
+        if not claimed.update(analytics_batch=batch) and not rebuild:
+            return state
+
+        watermark = 0 if rebuild else state.watermark
+        questions, answers = {}, {}
+        for group in aggregate_answers(quiz_id, batch):
+            totals = questions.setdefault(group['question_id'], [0] * len(QUESTION_SUMS))
+            for i, field in enumerate(QUESTION_SUMS):
+                totals[i] += group[field] or 0
+            if group['answer_id'] is not None:
+                answers[group['answer_id']] = (group['attempts'], group['question_id'])
+            watermark = max(watermark, group['last_submission'])
+
+        if rebuild:
+            QuestionStats.objects.filter(quiz_id=quiz_id).delete()
+            AnswerStats.objects.filter(question__quiz_id=quiz_id).delete()
+            existing_questions, existing_answers = {}, {}
+        else:
+            existing_questions = QuestionStats.objects.in_bulk(list(questions))
+            existing_answers = AnswerStats.objects.in_bulk(list(answers))
+
+        merge(QuestionStats, existing_questions, questions, QUESTION_SUMS, {pk: {'quiz_id': quiz_id} for pk in questions})
+        merge(
+            AnswerStats, existing_answers,
+            {pk: (picks,) for pk, (picks, _) in answers.items()}, ('picks',),
+            {pk: {'question_id': question_id} for pk, (_, question_id) in answers.items()},
+        )
+
+        state.batch = batch
+        state.watermark = watermark
+        state.refreshed_at = timezone.now()
+        state.save()
+    return state
+
+
+def refresh_tracked(quiz_ids):
+    """Refresh the quizzes among ``quiz_ids`` whose statistics have been read before."""
+    for quiz_id in QuizAnalytics.objects.filter(quiz_id__in=quiz_ids).values_list('quiz_id', flat=True):
+        refresh_analytics(quiz_id)
+
+
+def discard_analytics(quiz_id):
+    QuizAnalytics.objects.filter(quiz_id=quiz_id).delete()
+
+
+def item_analytics(quiz_id):
+    """The refreshed statistics of every question of a quiz, with every answer's pick count."""
+    state = refresh_analytics(quiz_id)
+    stats = {row.question_id: row for row in QuestionStats.objects.filter(quiz_id=quiz_id)}
+    picks = dict(AnswerStats.objects.filter(question__quiz_id=quiz_id).values_list('answer_id', 'picks'))
+    choices = {}
+    for answer in Answer.objects.filter(question__quiz_id=quiz_id).order_by('id'):
+        choices.setdefault(answer.question_id, []).append(answer)
+
+    items = []
+    for question in Question.objects.filter(quiz_id=quiz_id).order_by('id'):
+        row = stats.get(question.id) or QuestionStats(question=question)
+        items.append({
+            'question_id': question.id,
+            'text': question.text,
+            'question_type': question.question_type,
+            'attempts': row.attempts,
+            'percent_correct': row.percent_correct,
+            'discrimination': row.discrimination,
+            'answers': [
+                {
+                    'answer_id': answer.id,
+                    'text': answer.text,
+                    'is_correct': answer.is_correct,
+                    'picks': picks.get(answer.id, 0),
+                    'pick_rate': picks.get(answer.id, 0) / row.attempts if row.attempts else None,
+                }
+                for answer in choices.get(question.id, [])
+            ],
+        })
+    return {
+        'quiz_id': quiz_id,
+        'watermark': state.watermark,
+        'refreshed_at': state.refreshed_at,
+        'questions': items,
+    }
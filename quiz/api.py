@@ -1,19 +1,44 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Count, Max, prefetch_related_objects
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Quiz, UserSubmission, Event, UserAnswer, Answer, Question
+from .analytics import item_analytics
+from .conditional import conditional_response, version_etag
+from .export import FORMATS, export_lines, export_queryset, export_rows
+from .content import quiz_versions, render_quiz_json
+from .grading import DuplicateSubmission, save_submission
+from .leaderboard import get_leaderboard
+from .models import Quiz, UserSubmission, Event, UserAnswer, QueuedSubmission
+from .ical import event_range
+from .pagination import EventKeysetPagination, SubmissionCursorPagination
+from .submission_queue import enqueue_submission
 from .serializers import (
     RegisterSerializer, QuizSerializer, EventSerializer, UserSubmissionSerializer,
-    UserAnswerSerializer, QuizSubmissionSerializer, QuizCreateSerializer,
+    UserAnswerSerializer, QuizSubmissionSerializer, SubmissionPayloadSerializer, QuizCreateSerializer,
+    QuizDocumentSerializer, submitted_submission_data, error_paths, EventRangeQuerySerializer,
+    SubmissionExportQuerySerializer,
     QuestionCreateSerializer, AnswerCreateSerializer, EventCreateSerializer,
     QuestionSerializer, AnswerSerializer
 )
 
 
+def lookup_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise Http404
+
+
 class RegisterViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
@@ -22,20 +47,123 @@ class RegisterViewSet(viewsets.ModelViewSet):
 
 class QuizViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.prefetch_related('questions__answers')
     serializer_class = QuizSerializer
 
+    def list(self, request, *args, **kwargs):
+        versions = quiz_versions()
+
+        def render():
+            parts = render_quiz_json(versions)
+            return HttpResponse(b'[' + b','.join(parts) + b']', content_type='application/json')
+
+        last_modified = max((updated_at for _, updated_at, _ in versions), default=None)
+        return conditional_response(request, version_etag('quizzes', versions), last_modified, render)
+
+    def retrieve(self, request, *args, **kwargs):
+        versions = quiz_versions(Quiz.objects.filter(pk=lookup_id(kwargs['pk'])))
+        if not versions:
+            raise Http404
+
+        def render():
+            return HttpResponse(render_quiz_json(versions)[0], content_type='application/json')
+
+        return conditional_response(request, version_etag('quiz', versions), versions[0][1], render)
+
+    @action(detail=True, methods=['get'])
+    def leaderboard(self, request, pk=None):
+        board = get_leaderboard(lookup_id(pk))
+        if board is None:
+            raise Http404
+
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'detail': 'Limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, 100))
+
+        return Response({
+            'quiz_id': board.quiz_id,
+            'total': len(board),
+            'top': board.top(limit),
+            'me': board.rank_of(request.user.id),
+        })
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def analytics(self, request, pk=None):
+        quiz_id = lookup_id(pk)
+        if not Quiz.objects.filter(pk=quiz_id).exists():
+            raise Http404
+        return Response(item_analytics(quiz_id))
+
 
 class EventViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    pagination_class = EventKeysetPagination
+
+    def get_queryset(self):
+        if self.action != 'list':
+            return super().get_queryset()
+        params = EventRangeQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return event_range(params.validated_data.get('from'), params.validated_data.get('to'))
+
+    def list(self, request, *args, **kwargs):
+        stats = self.get_queryset().aggregate(total=Count('id'), last_modified=Max('updated_at'))
+        render = partial(super().list, request, *args, **kwargs)
+        etag = version_etag('events', stats['total'], stats['last_modified'])
+        return conditional_response(request, etag, stats['last_modified'], render)
+
+    def retrieve(self, request, *args, **kwargs):
+        event_id = lookup_id(kwargs['pk'])
+        updated_at = self.get_queryset().filter(pk=event_id).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise Http404
+        render = partial(super().retrieve, request, *args, **kwargs)
+        return conditional_response(request, version_etag('event', event_id, updated_at), updated_at, render)
 
 
 class UserSubmissionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     queryset = UserSubmission.objects.all()
     serializer_class = UserSubmissionSerializer
+    pagination_class = SubmissionCursorPagination
+
+    def query_param_list(self, name):
+        value = self.request.query_params.get(name, '')
+        return {item.strip() for item in value.split(',') if item.strip()}
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(user_name=self.request.user)
+        expand = self.query_param_list('expand')
+        if 'quiz' in expand:
+            queryset = queryset.select_related('quiz').prefetch_related('quiz__questions__answers')
+        if 'user_answers' in expand:
+            queryset = queryset.prefetch_related('user_answers')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.query_param_list('fields'))
+        kwargs.setdefault('expand', self.query_param_list('expand'))
+        return super().get_serializer(*args, **kwargs)
+
+
+class SubmissionExportApi(APIView):
+    """Every submission (``?quiz=``, ``?since=``, ``?until=``) with its answers, streamed as CSV or NDJSON."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, fmt):
+        params = SubmissionExportQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        bounds = params.validated_data
+        rows = export_rows(export_queryset(bounds.get('quiz'), bounds.get('since'), bounds.get('until')))
+        response = StreamingHttpResponse(export_lines(rows, fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="submissions.{fmt}"'
+        return response
 
 
 class UserAnswerViewSet(viewsets.ReadOnlyModelViewSet):
@@ -53,167 +181,66 @@ class QuizSubmissionApi(APIView):
                 {'detail': 'Request data is required.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
+        if getattr(settings, 'QUIZ_SUBMISSION_MODE', 'sync') == 'queued':
+            return self.enqueue(request)
+
         serializer = QuizSubmissionSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        quiz_id = serializer.validated_data.get('quiz_id')
-        answers = serializer.validated_data.get('answers', {})
-        user = request.user
-
-        if not quiz_id:
-            return Response(
-                {'detail': 'Quiz ID is required.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if not answers:
-            return Response(
-                {'detail': 'Answers are required.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
+        graded = serializer.validated_data['submission']
         try:
-            quiz = Quiz.objects.get(id=quiz_id)
-        except Quiz.DoesNotExist:
-            return Response({'detail': 'Quiz does not exist.'}, status=status.HTTP_404_NOT_FOUND)
-        except (ValueError, TypeError):
-            return Response(
-                {'detail': 'Invalid quiz ID format.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if UserSubmission.objects.filter(quiz=quiz, user_name=user).exists():
+            submission = save_submission(graded.quiz, request.user, graded.score, graded.user_answers)
+        except DuplicateSubmission:
             return Response(
                 {'detail': 'You have already completed this quiz.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not quiz.questions.exists():
-            return Response(
-                {'detail': 'This quiz has no questions available.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        submission = UserSubmission.objects.create(
-            quiz=quiz,
-            user_name=user,
-            score=0
-        )
-        score = 0
-
-        for question in quiz.questions.all():
-            question_key = str(question.id)
-            
-            if question_key not in answers:
-                submission.delete()
-                return Response(
-                    {'detail': f'Missing answer for question: {question.text[:50]}...'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            answer_value = answers[question_key]
-            
-            if answer_value is None:
-                submission.delete()
-                return Response(
-                    {'detail': f'Answer cannot be null for question: {question.text[:50]}...'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            if not isinstance(answer_value, str):
-                answer_value = str(answer_value)
-            
-            answer_value = answer_value.strip()
-
-            if question.question_type == "MCQ":
-                if not answer_value or answer_value == '':
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Please answer question: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                try:
-                    answer_id = int(answer_value)
-                except (ValueError, TypeError):
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Invalid answer format for question: {question.text[:50]}. Expected a numeric answer ID.'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                if answer_id <= 0:
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Answer ID must be a positive integer for question: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                try:
-                    selected_answer = Answer.objects.get(id=answer_id)
-                except Answer.DoesNotExist:
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Selected answer does not exist for question: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                if selected_answer.question != question:
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Invalid answer selected. Answer does not belong to question: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                correct = selected_answer.is_correct
-                if correct:
-                    score += 1
-
-                UserAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    answer=selected_answer,
-                    is_correct=correct,
-                )
-            elif question.question_type == "TEXT":
-                if not answer_value or answer_value == '':
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Please provide an answer for: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                if len(answer_value) > 1000:
-                    submission.delete()
-                    return Response(
-                        {'detail': f'Text answer is too long. Maximum 1000 characters allowed for question: {question.text[:50]}...'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                UserAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    answer=None,
-                    is_correct=False,
-                )
-            else:
-                submission.delete()
-                return Response(
-                    {'detail': f'Unknown question type for question: {question.text[:50]}...'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        submission.score = score
-        submission.save()
-
-        submission_serializer = UserSubmissionSerializer(submission)
         return Response({
             'message': 'Quiz submitted successfully',
-            'submission': submission_serializer.data
+            'submission': submitted_submission_data(submission, graded),
         }, status=status.HTTP_201_CREATED)
 
+    def enqueue(self, request):
+        serializer = SubmissionPayloadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ticket = enqueue_submission(
+            serializer.validated_data['quiz_id'], request.user, serializer.validated_data['answers'],
+        )
+        status_url = reverse('api:api-quiz-submission-status', args=[ticket.id])
+        return Response({
+            'ticket': ticket.id,
+            'status': ticket.status,
+            'status_url': request.build_absolute_uri(status_url),
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
+
+
+class QuizSubmissionStatusApi(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, ticket_id):
+        ticket = (
+            QueuedSubmission.objects.filter(pk=ticket_id, user=request.user)
+            .select_related('submission')
+            .first()
+        )
+        if ticket is None:
+            raise Http404
+
+        data = {'ticket': ticket.id, 'status': ticket.status}
+        headers = {}
+        if ticket.status == QueuedSubmission.PENDING:
+            headers['Retry-After'] = '1'
+        elif ticket.status == QueuedSubmission.FAILED:
+            data['detail'] = ticket.detail
+        elif ticket.submission is not None:
+            data['submission'] = UserSubmissionSerializer(ticket.submission).data
+        return Response(data, headers=headers)
+
 
 class QuizCreateApi(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -238,6 +265,28 @@ class QuizCreateApi(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class QuizBulkCreateApi(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not request.data:
+            return Response(
+                {'detail': 'Request data is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = QuizDocumentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'errors': error_paths(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+        quiz = serializer.save()
+        prefetch_related_objects([quiz], 'questions__answers')
+        return Response({
+            'message': 'Quiz created successfully',
+            'quiz': QuizSerializer(quiz).data
+        }, status=status.HTTP_201_CREATED)
+
+
 class QuestionCreateApi(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
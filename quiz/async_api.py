@@ -0,0 +1,129 @@
+"""
+Async counterparts of the quiz fetch and submit endpoints.
+
+Served under ASGI these never hold a worker thread while waiting on the
+database, so one process can keep many submissions in flight at event start.
+They share grading, caching and ETags with the DRF views in ``quiz.api`` but,
+since DRF views are sync-only, authenticate JWTs themselves (through the same
+user cache).
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, Http404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+from .conditional import aconditional_response, version_etag
+from .content import aquiz_versions, arender_quiz_json
+from .grading import DuplicateSubmission, InvalidSubmission, agrade_submission, save_submission
+from .models import Quiz
+from .serializers import QUIZ_MISSING, SubmissionShapeSerializer, submitted_submission_data
+
+_jwt = CachedJWTAuthentication()
+
+
+def error(detail, status=400, **kwargs):
+    return JsonResponse({'detail': detail}, status=status, **kwargs)
+
+
+async def authenticate(request):
+    """Async ``JWTAuthentication.authenticate``: token checks are pure, cache misses load the user."""
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    return await _jwt.aget_user(_jwt.get_validated_token(raw_token))
+
+
+def jwt_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        challenge = {'WWW-Authenticate': _jwt.authenticate_header(request)}
+        try:
+            user = await authenticate(request)
+        except AuthenticationFailed as exc:
+            detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+            return JsonResponse(detail, status=exc.status_code, headers=challenge)
+        if user is None:
+            return error('Authentication credentials were not provided.', status=401, headers=challenge)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_GET
+@jwt_required
+async def quiz_list(request):
+    versions = await aquiz_versions()
+
+    async def render():
+        parts = await arender_quiz_json(versions)
+        return HttpResponse(b'[' + b','.join(parts) + b']', content_type='application/json')
+
+    last_modified = max((updated_at for _, updated_at, _ in versions), default=None)
+    return await aconditional_response(request, version_etag('quizzes', versions), last_modified, render)
+
+
+@require_GET
+@jwt_required
+async def quiz_detail(request, pk):
+    versions = await aquiz_versions(Quiz.objects.filter(pk=pk))
+    if not versions:
+        raise Http404
+
+    async def render():
+        parts = await arender_quiz_json(versions)
+        return HttpResponse(parts[0], content_type='application/json')
+
+    return await aconditional_response(request, version_etag('quiz', versions), versions[0][1], render)
+
+
+def parse_body(body):
+    """The JSON payload of a submit request; raises ``InvalidSubmission`` for an empty or malformed body."""
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        raise InvalidSubmission('JSON parse error.')
+    if not data:
+        raise InvalidSubmission('Request data is required.')
+    return data
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+async def submit_quiz(request):
+    # The same checks, messages and response as QuizSubmissionApi, with the
+    # quiz read and the grading done without leaving the event loop.
+    try:
+        data = parse_body(request.body)
+    except InvalidSubmission as exc:
+        return error(exc.detail)
+
+    payload = SubmissionShapeSerializer(data=data)
+    if not payload.is_valid():
+        return JsonResponse(payload.errors, status=400)
+
+    quiz = await Quiz.objects.filter(pk=payload.validated_data['quiz_id']).afirst()
+    if quiz is None:
+        return JsonResponse({'quiz_id': [QUIZ_MISSING]}, status=400)
+
+    try:
+        graded = await agrade_submission(quiz, payload.validated_data['answers'])
+    except InvalidSubmission as exc:
+        return JsonResponse({'non_field_errors': [exc.detail]}, status=400)
+
+    # The ORM has no async transactions; the two INSERTs run in one worker thread.
+    try:
+        submission = await sync_to_async(save_submission)(quiz, request.user, graded.score, graded.user_answers)
+    except DuplicateSubmission:
+        return error('You have already completed this quiz.')
+
+    return JsonResponse({
+        'message': 'Quiz submitted successfully',
+        'submission': submitted_submission_data(submission, graded),
+    }, status=201)
@@ -0,0 +1,65 @@
+"""
+JWT authentication that resolves users from a short-lived, process-local cache.
+
+``JWTAuthentication`` loads the user row on every request. Here the user's
+column values are kept for ``QUIZ_AUTH_CACHE_TTL`` seconds, keyed by user id,
+and every request gets a new instance built from them. With
+``SIMPLE_JWT['CHECK_REVOKE_TOKEN']`` on, entries are also tagged with the
+token's password-hash claim, so a token issued before a password change never
+matches a cached entry. Saving or deleting a user evicts the entry in this
+process, and other processes notice within the TTL.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .cache import LRUCache
+
+_users = LRUCache(maxsize=getattr(settings, 'QUIZ_AUTH_CACHE_SIZE', 10000))
+
+
+def token_version(validated_token):
+    return validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM)
+
+
+def cached_user(validated_token):
+    entry = _users.get(str(validated_token.get(jwt_settings.USER_ID_CLAIM)))
+    if entry is None:
+        return None
+    version, expires, model, db, values = entry
+    if version != token_version(validated_token) or expires < time.monotonic():
+        return None
+    # A new instance per request, so nothing a view sets on it (cached
+    # relations, permission caches) leaks into the next one.
+    return model.from_db(db, [field.attname for field in model._meta.concrete_fields], values)
+
+
+def cache_user(validated_token, user):
+    ttl = getattr(settings, 'QUIZ_AUTH_CACHE_TTL', 30)
+    if ttl > 0:
+        key = str(getattr(user, jwt_settings.USER_ID_FIELD))
+        values = tuple(getattr(user, field.attname) for field in user._meta.concrete_fields)
+        _users.set(key, (token_version(validated_token), time.monotonic() + ttl, type(user), user._state.db, values))
+
+
+def forget_user(user):
+    _users.pop(str(getattr(user, jwt_settings.USER_ID_FIELD)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user = cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(validated_token, user)
+        return user
+
+    async def aget_user(self, validated_token):
+        user = cached_user(validated_token)
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+            cache_user(validated_token, user)
+        return user
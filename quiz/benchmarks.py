@@ -0,0 +1,593 @@
+"""
+Benchmarks for the quiz hot paths.
+
+``run_benchmarks`` times each endpoint at several quiz sizes and checks its
+SQL query count against a budget, which ``quiz.tests.BenchmarkBudgetTests``
+also enforces. The other ``run_*`` functions back the ``benchmark_*``
+management commands, which run them on a throwaway database.
+"""
+import asyncio
+import collections
+import datetime
+import io
+import itertools
+import json
+import logging
+import platform
+import queue
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import Client, RequestFactory
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication
+from .grading import build_answer_key, grade_answers, save_submission
+from .models import Quiz, Question, Answer, UserSubmission, UserAnswer, Event
+from .signals import bump_content_version
+
+SIZES = (10, 100, 1000)
+ANSWERS_PER_QUESTION = 4
+
+_user_ids = itertools.count(1)
+
+
+def build_quiz(num_questions):
+    """Create a quiz with ``num_questions`` MCQ questions using bulk inserts."""
+    quiz = Quiz.objects.create(title=f"Benchmark quiz ({num_questions} questions)")
+    questions = Question.objects.bulk_create(
+        Question(quiz=quiz, text=f"Benchmark question {i}?") for i in range(num_questions)
+    )
+    Answer.objects.bulk_create(
+        Answer(question=question, text=f"Option {j}", is_correct=j == 0)
+        for question in questions
+        for j in range(ANSWERS_PER_QUESTION)
+    )
+    bump_content_version(Quiz.objects.filter(pk=quiz.pk), question_count=len(questions))
+    quiz.refresh_from_db()
+    return quiz
+
+
+@contextmanager
+def throwaway_database():
+    """Run the body against a fresh test database, destroyed afterwards."""
+    # Large quizzes are slow on purpose here; don't log every request.
+    logging.getLogger('quiz.middleware').setLevel(logging.ERROR)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def write_results(path, results):
+    with open(path, 'w') as fh:
+        json.dump({'environment': environment(), 'results': results}, fh, indent=2)
+
+
+def new_user():
+    return User.objects.create(username=f"bench_user_{next(_user_ids)}")
+
+
+def new_users(count, **fields):
+    return User.objects.bulk_create(
+        User(username=f"bench_user_{next(_user_ids)}", **fields) for _ in range(count)
+    )
+
+
+def correct_answers(quiz):
+    return dict(
+        Answer.objects.filter(question__quiz=quiz, is_correct=True).values_list('question_id', 'id')
+    )
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def web_client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+# Each scenario prepares a request for a quiz (user, session, fixtures) and
+# returns a zero-argument callable that only performs the request. Prepared
+# requests are used once, since submitting needs a fresh user every time.
+
+def submit_api(quiz, answers):
+    client = api_client(new_user())
+    payload = {'quiz_id': quiz.id, 'answers': {str(q): str(a) for q, a in answers.items()}}
+    url = reverse('api:api-quiz-submit')
+    return lambda: client.post(url, payload, format='json')
+
+
+def quiz_detail_get(quiz, answers):
+    client = web_client(new_user())
+    url = reverse('quiz_detail', args=[quiz.id])
+    return lambda: client.get(url)
+
+
+def quiz_detail_post(quiz, answers):
+    client = web_client(new_user())
+    data = {f'question_{q}': a for q, a in answers.items()}
+    url = reverse('quiz_detail', args=[quiz.id])
+    return lambda: client.post(url, data)
+
+
+def quiz_viewset_list(quiz, answers):
+    client = api_client(new_user())
+    url = reverse('api:api-quiz-list')
+    return lambda: client.get(url)
+
+
+def quiz_viewset_retrieve(quiz, answers):
+    client = api_client(new_user())
+    url = reverse('api:api-quiz-detail', args=[quiz.id])
+    return lambda: client.get(url)
+
+
+def quiz_list(quiz, answers):
+    client = web_client(new_user())
+    url = reverse('quiz_list')
+    return lambda: client.get(url)
+
+
+def quiz_result(quiz, answers):
+    user = new_user()
+    submission = UserSubmission.objects.create(quiz=quiz, user_name=user, score=len(answers), max_score=len(answers))
+    client = web_client(user)
+    url = reverse('quiz_result', args=[submission.id])
+    return lambda: client.get(url)
+
+
+# name -> (scenario, expected status, query budget as a function of quiz size).
+# ``n // 199`` accounts for SQLite splitting the bulk answer insert into
+# batches of 199 rows (999 parameters over five columns).
+SCENARIOS = {
+    'QuizSubmissionApi.post': (submit_api, 201, lambda n: 6 + n // 199),
+    'QuizDetail.get': (quiz_detail_get, 200, lambda n: 4),
+    'QuizDetail.post': (quiz_detail_post, 302, lambda n: 8 + n // 199),
+    'QuizViewSet.list': (quiz_viewset_list, 200, lambda n: 1),
+    'QuizViewSet.retrieve': (quiz_viewset_retrieve, 200, lambda n: 1),
+    'QuizList.get': (quiz_list, 200, lambda n: 3),
+    'quiz_result': (quiz_result, 200, lambda n: 3),
+}
+
+
+def events_page(quiz, answers):
+    client = web_client(new_user())
+    url = reverse('events')
+    return lambda: client.get(url)
+
+
+# Pages with cached fragments. A cold run clears the fragment cache first,
+# which renders the page the way it was rendered before fragment caching;
+# the other process-local caches stay warm in both runs.
+RENDER_PAGES = {
+    'QuizDetail.get': quiz_detail_get,
+    'QuizList.get': quiz_list,
+    'event': events_page,
+}
+
+
+def build_events(count):
+    Event.objects.all().delete()
+    today = timezone.now().date()
+    Event.objects.bulk_create(
+        Event(
+            title=f"Benchmark event {i}",
+            description="An event used to benchmark page rendering. " * 4,
+            date=today + datetime.timedelta(days=i),
+            location="Main hall",
+        )
+        for i in range(count)
+    )
+
+
+def time_render(scenario, quiz, answers, repeat, cold):
+    timings = []
+    for _ in range(repeat):
+        request = scenario(quiz, answers)
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = request()
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f"Unexpected status {response.status_code} (expected 200)")
+    return statistics.median(timings)
+
+
+def run_render_benchmarks(sizes=SIZES, repeat=5):
+    results = []
+    for size in sizes:
+        quiz = build_quiz(size)
+        answers = correct_answers(quiz)
+        build_events(size)
+        for name, scenario in RENDER_PAGES.items():
+            scenario(quiz, answers)()
+            cold = time_render(scenario, quiz, answers, repeat, cold=True)
+            scenario(quiz, answers)()
+            warm = time_render(scenario, quiz, answers, repeat, cold=False)
+            results.append({
+                'endpoint': name,
+                'size': size,
+                'cold_median_ms': round(cold, 3),
+                'warm_median_ms': round(warm, 3),
+                'speedup': round(cold / warm, 2),
+                'runs': repeat,
+            })
+    return results
+
+
+def measure(scenario, quiz, answers, expected_status, repeat):
+    # Warm up process-local caches so the numbers reflect steady state.
+    scenario(quiz, answers)()
+
+    request = scenario(quiz, answers)
+    with CaptureQueriesContext(connection) as ctx:
+        response = request()
+    if response.status_code != expected_status:
+        raise AssertionError(
+            f"Unexpected status {response.status_code} (expected {expected_status})"
+        )
+    queries = len(ctx.captured_queries)
+
+    timings = []
+    for _ in range(repeat):
+        request = scenario(quiz, answers)
+        start = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - start) * 1000)
+    return queries, timings
+
+
+def run_benchmarks(sizes=SIZES, repeat=5, names=None):
+    results = []
+    for size in sizes:
+        quiz = build_quiz(size)
+        answers = correct_answers(quiz)
+        for name, (scenario, expected_status, budget) in SCENARIOS.items():
+            if names and name not in names:
+                continue
+            queries, timings = measure(scenario, quiz, answers, expected_status, repeat)
+            results.append({
+                'endpoint': name,
+                'questions': size,
+                'queries': queries,
+                'query_budget': budget(size),
+                'within_budget': queries <= budget(size),
+                'timings_ms': {
+                    'min': round(min(timings), 3),
+                    'median': round(statistics.median(timings), 3),
+                    'max': round(max(timings), 3),
+                },
+                'runs': repeat,
+            })
+    return results
+
+
+# Concurrent submissions through the full WSGI / ASGI stacks. WSGI requests
+# hit the DRF endpoint from a pool of worker threads, as a threaded server
+# would; ASGI requests hit the async endpoint from a single event loop, each
+# in its own ThreadSensitiveContext exactly like under uvicorn or daphne.
+
+def submit_requests(quiz, answers, count):
+    """``count`` (authorization header, JSON body) pairs, one fresh user each."""
+    users = new_users(count)
+    body = json.dumps({'quiz_id': quiz.id, 'answers': {str(q): str(a) for q, a in answers.items()}}).encode()
+    return [(f'Bearer {AccessToken.for_user(user)}', body) for user in users]
+
+
+def wsgi_post(application, path, authorization, body):
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_AUTHORIZATION': authorization,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(int(status[:3])))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return statuses[0]
+
+
+async def asgi_post(application, path, authorization, body):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'authorization', authorization.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.get_running_loop().create_future()
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Django listens for a client disconnect while the view runs.
+        return await disconnected
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+def summarize(mode, concurrency, elapsed, latencies, statuses):
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'median': round(statistics.median(latencies), 3),
+            'p95': round(statistics.quantiles(latencies, n=20)[-1], 3) if len(latencies) > 1 else round(latencies[0], 3),
+            'max': round(max(latencies), 3),
+        },
+        'statuses': dict(collections.Counter(statuses)),
+    }
+
+
+def run_wsgi_submits(requests, threads):
+    application = get_wsgi_application()
+    path = reverse('api:api-quiz-submit')
+
+    def timed(request):
+        start = time.perf_counter()
+        status = wsgi_post(application, path, *request)
+        return status, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(timed, requests))
+    elapsed = time.perf_counter() - start
+    return summarize('wsgi', threads, elapsed, [ms for _, ms in results], [status for status, _ in results])
+
+
+def run_asgi_submits(requests, concurrency):
+    application = get_asgi_application()
+    path = reverse('api:api-async-quiz-submit')
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def timed(request):
+            async with slots:
+                start = time.perf_counter()
+                status = await asgi_post(application, path, *request)
+                return status, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(request) for request in requests))
+        return time.perf_counter() - start, results
+
+    elapsed, results = asyncio.run(main())
+    return summarize('asgi', concurrency, elapsed, [ms for _, ms in results], [status for status, _ in results])
+
+
+def run_concurrent_submits(num_questions=100, count=200, threads=8, concurrency=50):
+    """Submit ``count`` graded answers through each stack and report throughput."""
+    quiz = build_quiz(num_questions)
+    answers = correct_answers(quiz)
+    wsgi = run_wsgi_submits(submit_requests(quiz, answers, count), threads)
+    asgi = run_asgi_submits(submit_requests(quiz, answers, count), concurrency)
+    return [dict(result, questions=num_questions) for result in (wsgi, asgi)]
+
+
+def run_write_load(num_questions=20, count=500, threads=8):
+    """
+    Save ``count`` graded submissions from ``threads`` threads, each with its
+    own connection, and report throughput, latency and database errors.
+    """
+    quiz = build_quiz(num_questions)
+    answers = correct_answers(quiz)
+    pending = queue.Queue()
+    for user in new_users(count):
+        pending.put(user)
+
+    latencies = []
+    errors = collections.Counter()
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                try:
+                    user = pending.get_nowait()
+                except queue.Empty:
+                    return
+                user_answers = [
+                    UserAnswer(question_id=question_id, answer_id=answer_id, is_correct=True)
+                    for question_id, answer_id in answers.items()
+                ]
+                start = time.perf_counter()
+                try:
+                    save_submission(quiz, user, len(user_answers), user_answers)
+                except OperationalError as exc:
+                    with lock:
+                        errors[str(exc)] += 1
+                else:
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                # What the end of a request does: profiles that keep
+                # connections open reuse them for the next submission.
+                close_old_connections()
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'profile': getattr(settings, 'DB_PROFILE', connection.vendor),
+        'database': connection.vendor,
+        'questions': num_questions,
+        'threads': threads,
+        'submissions': len(latencies),
+        'errors': dict(errors),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_wps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'median': round(statistics.median(latencies), 3) if latencies else None,
+            'max': round(max(latencies), 3) if latencies else None,
+        },
+    }
+
+
+TEXT_ACCEPTED = ("Guido van Rossum", "Van Rossum", "Guido")
+TEXT_RESPONSES = (
+    "guido van rossum",           # case
+    "  Guido  van-Rossum!! ",     # whitespace and punctuation
+    "ＧＵＩＤＯ",                  # full-width Unicode
+    "Guido van Rosum",            # one typo
+    "Gudio van Rossum",           # transposition
+    "Linus Torvalds",             # wrong
+    "Dennis Ritchie and Ken Thompson wrote it in the early seventies",  # long and wrong
+)
+
+
+def run_text_matching(num_questions=50, submissions=400, distances=(0, 1, 2)):
+    """
+    Grade ``submissions`` all-TEXT submissions against an in-memory answer key
+    for each edit distance tolerance and report text answers graded per second
+    on one core.
+    """
+    question_rows = [(i, f"Who created Python ({i})?", 'TEXT') for i in range(1, num_questions + 1)]
+    answer_ids = itertools.count(1)
+    answer_rows = [
+        (next(answer_ids), question_id, True, text)
+        for question_id, _, _ in question_rows
+        for text in TEXT_ACCEPTED
+    ]
+    payloads = [
+        {str(question_id): TEXT_RESPONSES[(n + question_id) % len(TEXT_RESPONSES)] for question_id, _, _ in question_rows}
+        for n in range(submissions)
+    ]
+
+    results = []
+    for distance in distances:
+        with override_settings(QUIZ_TEXT_MATCH_DISTANCE=distance):
+            start = time.perf_counter()
+            answer_key = build_answer_key(Quiz(pk=0), question_rows, answer_rows)
+            compile_ms = (time.perf_counter() - start) * 1000
+
+        correct = 0
+        start = time.perf_counter()
+        for answers in payloads:
+            score, _ = grade_answers(answer_key, answers)
+            correct += score
+        elapsed = time.perf_counter() - start
+        graded = num_questions * submissions
+        results.append({
+            'distance': distance,
+            'questions': num_questions,
+            'answers': graded,
+            'matched': correct,
+            'compile_ms': round(compile_ms, 3),
+            'elapsed_s': round(elapsed, 3),
+            'answers_per_s': round(graded / elapsed),
+        })
+    return results
+
+
+def run_auth_benchmark(requests=2000, users=50):
+    """
+    Authenticate ``requests`` bearer-token requests spread over ``users``
+    users, with and without the user cache, and report time and queries per request.
+    """
+    tokens = [f'Bearer {AccessToken.for_user(user)}' for user in new_users(users, password='!')]
+    factory = RequestFactory()
+    results = []
+    for name, authenticator in (('jwt', JWTAuthentication()), ('cached_jwt', CachedJWTAuthentication())):
+        batch = [
+            Request(factory.get('/api/quizzes/', HTTP_AUTHORIZATION=tokens[i % users]))
+            for i in range(requests)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for request in batch:
+                authenticator.authenticate(request)
+            elapsed = time.perf_counter() - start
+        results.append({
+            'authentication': name,
+            'requests': requests,
+            'users': users,
+            'queries_per_request': round(len(ctx.captured_queries) / requests, 3),
+            'us_per_request': round(elapsed / requests * 1e6, 1),
+        })
+    return results
+
+
+def environment():
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
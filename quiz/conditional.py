@@ -0,0 +1,42 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+
+def version_etag(*parts):
+    """Strong ETag derived from the version data a response is rendered from."""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+
+def finalize(response, etag, timestamp):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Content rarely changes but must never be served stale: let clients
+        # keep a private copy and revalidate it on every use.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, etag, last_modified, render):
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` with a 304 before the body
+    is built; ``render`` is only called when the client's copy is stale.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+    return finalize(response, etag, timestamp)
+
+
+async def aconditional_response(request, etag, last_modified, render):
+    """``conditional_response`` for an async ``render`` coroutine function."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await render()
+    return finalize(response, etag, timestamp)
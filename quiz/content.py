@@ -0,0 +1,77 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+from rest_framework.renderers import JSONRenderer
+
+from .cache import LRUCache
+from .models import Quiz
+from .serializers import QuizSerializer
+
+VERSION_FIELDS = ('id', 'updated_at', 'content_version')
+
+_quiz_json = LRUCache(maxsize=getattr(settings, 'QUIZ_JSON_CACHE_SIZE', 512))
+
+
+def quiz_versions(queryset=None):
+    """``(id, updated_at, content_version)`` rows: enough to validate cached renderings."""
+    if queryset is None:
+        queryset = Quiz.objects.all()
+    return list(queryset.order_by('id').values_list(*VERSION_FIELDS))
+
+
+def list_version(queryset):
+    """``(row count, latest updated_at)``: changes whenever a row is added, edited or deleted."""
+    stats = queryset.aggregate(total=Count('id'), last_modified=Max('updated_at'))
+    return stats['total'], stats['last_modified']
+
+
+def split_cached(versions):
+    """Cached renderings still valid for ``versions``, and the quiz ids that need rendering."""
+    rendered = {}
+    missing = []
+    for quiz_id, updated_at, content_version in versions:
+        cached = _quiz_json.get(quiz_id)
+        if cached is not None and cached[0] == (updated_at, content_version):
+            rendered[quiz_id] = cached[1]
+        else:
+            missing.append(quiz_id)
+    return rendered, missing
+
+
+def load_quiz_json(quiz_ids):
+    """Render and cache the given quizzes with a single prefetched query."""
+    rendered = {}
+    renderer = JSONRenderer()
+    for quiz in Quiz.objects.filter(pk__in=quiz_ids).prefetch_related('questions__answers'):
+        body = renderer.render(QuizSerializer(quiz).data)
+        _quiz_json.set(quiz.pk, ((quiz.updated_at, quiz.content_version), body))
+        rendered[quiz.pk] = body
+    return rendered
+
+
+def render_quiz_json(versions):
+    """
+    Return the serialized ``QuizSerializer`` bytes for each version row, in order.
+
+    Renderings are reused while the quiz's ``updated_at`` and ``content_version``
+    are unchanged; all misses are loaded with a single prefetched query.
+    """
+    rendered, missing = split_cached(versions)
+    if missing:
+        rendered.update(load_quiz_json(missing))
+    return [rendered[quiz_id] for quiz_id, _, _ in versions if quiz_id in rendered]
+
+
+async def aquiz_versions(queryset=None):
+    if queryset is None:
+        queryset = Quiz.objects.all()
+    return [row async for row in queryset.order_by('id').values_list(*VERSION_FIELDS)]
+
+
+async def arender_quiz_json(versions):
+    # Cache hits never leave the event loop; misses need the serializers'
+    # related managers, which are sync-only.
+    rendered, missing = split_cached(versions)
+    if missing:
+        rendered.update(await sync_to_async(load_quiz_json)(missing))
+    return [rendered[quiz_id] for quiz_id, _, _ in versions if quiz_id in rendered]
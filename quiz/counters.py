@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Quiz, Question, UserSubmission
+
+COUNTER_FIELDS = ('question_count', 'submission_count', 'score_sum')
+
+
+def add_submissions(quiz_id, count, score):
+    """Count ``count`` new submissions worth ``score`` points in total towards a quiz."""
+    Quiz.objects.filter(pk=quiz_id).update(
+        submission_count=F('submission_count') + count,
+        score_sum=F('score_sum') + score,
+    )
+
+
+def repair_counters(quizzes=None):
+    """
+    Recompute the counters of ``quizzes`` (default: all) from their rows and
+    return the quizzes whose stored values were wrong.
+    """
+    if quizzes is None:
+        quizzes = Quiz.objects.all()
+    with transaction.atomic():
+        quizzes = list(quizzes.select_for_update().only('id', *COUNTER_FIELDS))
+        quiz_ids = [quiz.id for quiz in quizzes]
+        questions = dict(
+            Question.objects.filter(quiz_id__in=quiz_ids)
+            .values('quiz_id').annotate(total=Count('id'))
+            .values_list('quiz_id', 'total')
+        )
+        submissions = {
+            quiz_id: (total, score or 0)
+            for quiz_id, total, score in UserSubmission.objects.filter(quiz_id__in=quiz_ids)
+            .values('quiz_id').annotate(total=Count('id'), score=Sum('score'))
+            .values_list('quiz_id', 'total', 'score')
+        }
+
+        repaired = []
+        for quiz in quizzes:
+            expected = (questions.get(quiz.id, 0), *submissions.get(quiz.id, (0, 0)))
+            if tuple(getattr(quiz, field) for field in COUNTER_FIELDS) != expected:
+                quiz.question_count, quiz.submission_count, quiz.score_sum = expected
+                repaired.append(quiz)
+        Quiz.objects.bulk_update(repaired, COUNTER_FIELDS, batch_size=500)
+    return repaired
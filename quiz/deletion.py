@@ -0,0 +1,75 @@
+"""
+Chunked deletion of quizzes.
+
+``Quiz.delete()`` collects every dependent row in memory, and sends a signal
+for each one, before deleting anything in one long transaction. Here the quiz
+is hidden first, so it drops out of the site and the API at once. Its rows are
+then deleted from the leaves up, one bounded chunk per short transaction.
+An interrupted deletion leaves a hidden quiz that the ``delete_quizzes``
+command finishes off.
+"""
+from django.db import transaction
+
+from .leaderboard import discard_leaderboard
+from .models import (
+    Quiz, Question, Answer, UserSubmission, UserAnswer, QueuedSubmission, QuizAnalytics, QuestionStats, AnswerStats,
+)
+from .signals import bump_content_version
+
+CHUNK_SIZE = 1000
+
+# Every table that points at a quiz, children before their parents, with the
+# lookup from each row to its quiz.
+STEPS = (
+    (UserAnswer, 'submission__quiz_id'),
+    (QueuedSubmission, 'quiz_id'),
+    (UserSubmission, 'quiz_id'),
+    (AnswerStats, 'question__quiz_id'),
+    (QuestionStats, 'quiz_id'),
+    (QuizAnalytics, 'quiz_id'),
+    # Answers recorded against this quiz's questions from any other submission.
+    (UserAnswer, 'question__quiz_id'),
+    (Answer, 'question__quiz_id'),
+    (Question, 'quiz_id'),
+)
+
+
+def hide_quizzes(quiz_ids):
+    bump_content_version(Quiz.all_objects.filter(pk__in=quiz_ids), is_hidden=True)
+
+
+def delete_chunk(model, lookup, quiz_id, chunk_size):
+    with transaction.atomic():
+        ids = list(model._base_manager.filter(**{lookup: quiz_id}).values_list('pk', flat=True)[:chunk_size])
+        if ids:
+            # No cascades are left below this table and the per-row signals
+            # only maintain state of the quiz being deleted, so skip both.
+            model._base_manager.filter(pk__in=ids)._raw_delete(model._base_manager.db)
+    return len(ids)
+
+
+def delete_quiz(quiz_id, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Hide the quiz, then delete it and everything under it in chunks of
+    ``chunk_size`` rows. ``progress(model, deleted)`` is called after each
+    chunk with the running total for that table. Returns those totals.
+    """
+    hide_quizzes([quiz_id])
+    deleted = {}
+    for model, lookup in STEPS:
+        while True:
+            count = delete_chunk(model, lookup, quiz_id, chunk_size)
+            if not count:
+                break
+            deleted[model] = deleted.get(model, 0) + count
+            if progress:
+                progress(model, deleted[model])
+
+    # Only the quiz row is left, so the regular delete has nothing to collect.
+    count = Quiz.all_objects.filter(pk=quiz_id).delete()[1].get(Quiz._meta.label, 0)
+    discard_leaderboard(quiz_id)
+    if count:
+        deleted[Quiz] = count
+        if progress:
+            progress(Quiz, count)
+    return deleted
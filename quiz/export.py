@@ -0,0 +1,99 @@
+"""
+Streaming export of submissions and their answers.
+
+Rows are read with a chunked server-side iterator (one LEFT JOIN of
+submissions to their answers, ordered by submission) and encoded one line
+at a time, so memory stays flat however many answer rows a quiz has.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import UserSubmission
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+SUBMISSION_COLUMNS = ('submission_id', 'quiz_id', 'user_id', 'username', 'score', 'max_score', 'submitted_at')
+ANSWER_COLUMNS = ('question_id', 'answer_id', 'answer_text', 'is_correct', 'response')
+COLUMNS = SUBMISSION_COLUMNS + ANSWER_COLUMNS
+
+_FIELDS = (
+    'id', 'quiz_id', 'user_name_id', 'user_name__username', 'score', 'max_score', 'submitted_at',
+    'user_answers__question_id', 'user_answers__answer_id', 'user_answers__answer__text',
+    'user_answers__is_correct', 'user_answers__text',
+)
+
+
+def parse_bound(value, end=False):
+    """
+    Parse a ``since``/``until`` bound: an ISO datetime, or a date meaning the
+    start of that day (or of the next day when ``end`` is set). Raises ``ValueError``.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value!r}")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(quiz_id=None, since=None, until=None):
+    """Submissions of ``quiz_id`` made in ``[since, until)``, one row per answer."""
+    submissions = UserSubmission.objects.all()
+    if quiz_id is not None:
+        submissions = submissions.filter(quiz_id=quiz_id)
+    if since is not None:
+        submissions = submissions.filter(submitted_at__gte=since)
+    if until is not None:
+        submissions = submissions.filter(submitted_at__lt=until)
+    return submissions.order_by('id', 'user_answers__id').values_list(*_FIELDS)
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+class Echo:
+    """A file-like object whose ``write`` hands the line back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row
+        )
+
+
+def ndjson_lines(rows):
+    """One JSON object per submission, with its answers nested."""
+    width = len(SUBMISSION_COLUMNS)
+    for submission, group in groupby(rows, key=lambda row: row[:width]):
+        document = dict(zip(SUBMISSION_COLUMNS, submission))
+        document['answers'] = [
+            dict(zip(ANSWER_COLUMNS, row[width:]))
+            for row in group
+            if row[width] is not None
+        ]
+        yield json.dumps(document, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(rows, fmt):
+    return csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
@@ -50,9 +50,6 @@ class RegisterForm(forms.ModelForm):
         if not re.match(r'^[a-zA-Z0-9_]+$', username):
             raise forms.ValidationError("Username can only contain letters, numbers, and underscores.")
         
-        if User.objects.filter(username__iexact=username).exists():
-            raise forms.ValidationError("A user with this username already exists.")
-        
         return username
 
     def clean_email(self):
@@ -75,9 +72,6 @@ class RegisterForm(forms.ModelForm):
         if not re.match(email_pattern, email):
             raise forms.ValidationError("Please enter a valid email address.")
         
-        if User.objects.filter(email__iexact=email).exists():
-            raise forms.ValidationError("A user with this email already exists.")
-        
         return email
 
     def clean_password(self):
@@ -103,6 +97,11 @@ class RegisterForm(forms.ModelForm):
         
         return password
 
+    def validate_unique(self):
+        # Usernames and emails are unique in any case; RegisterView relies on
+        # the database constraints instead of looking them up here.
+        pass
+
     def clean(self):
         cleaned_data = super().clean()
         password = cleaned_data.get("password")
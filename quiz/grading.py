@@ -0,0 +1,292 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .cache import LRUCache
+from .leaderboard import record_submission
+from .matching import TextMatcher
+from .models import Question, Answer, UserSubmission, UserAnswer
+
+
+class CompiledQuestion:
+    __slots__ = ('id', 'text', 'question_type')
+
+    def __init__(self, id, text, question_type):
+        self.id = id
+        self.text = text
+        self.question_type = question_type
+
+
+class AnswerKey:
+    """
+    Everything needed to grade a submission for one quiz, read in two queries.
+
+    Keys are tagged with the quiz ``content_version`` they were built from, so a
+    cached key is discarded as soon as a question or answer of the quiz changes.
+    """
+
+    def __init__(self, quiz_id, version, questions, answer_questions, correct_answers, text_matchers, choices):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.questions = questions
+        self.answer_questions = answer_questions
+        self.correct_answers = correct_answers
+        # question id -> TextMatcher, for TEXT questions.
+        self.text_matchers = text_matchers
+        # question id -> ((answer id, text), ...), for building forms.
+        self.choices = choices
+
+    def question_for(self, answer_id):
+        return self.answer_questions.get(answer_id)
+
+    def is_correct(self, answer_id):
+        return answer_id in self.correct_answers
+
+    def match_text(self, question_id, text):
+        """The id of the answer of a TEXT question that ``text`` matches, or ``None``."""
+        matcher = self.text_matchers.get(question_id)
+        return matcher.match(text) if matcher is not None else None
+
+
+_answer_keys = LRUCache(maxsize=getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_SIZE', 256))
+
+
+ANSWER_KEY_QUESTION_FIELDS = ('id', 'text', 'question_type')
+ANSWER_KEY_ANSWER_FIELDS = ('id', 'question_id', 'is_correct', 'text')
+
+
+def answer_key_querysets(quiz):
+    questions = Question.objects.filter(quiz_id=quiz.pk).order_by('id').values_list(*ANSWER_KEY_QUESTION_FIELDS)
+    answers = Answer.objects.filter(question__quiz_id=quiz.pk).order_by('id').values_list(*ANSWER_KEY_ANSWER_FIELDS)
+    return questions, answers
+
+
+def build_answer_key(quiz, question_rows, answer_rows):
+    questions = tuple(CompiledQuestion(*row) for row in question_rows)
+    text_answers = {question.id: [] for question in questions if question.question_type == 'TEXT'}
+    answer_questions = {}
+    correct_answers = set()
+    choices = {}
+    for answer_id, question_id, is_correct, text in answer_rows:
+        answer_questions[answer_id] = question_id
+        choices.setdefault(question_id, []).append((answer_id, text))
+        if is_correct:
+            correct_answers.add(answer_id)
+        if question_id in text_answers:
+            text_answers[question_id].append((answer_id, text, is_correct))
+
+    distance = getattr(settings, 'QUIZ_TEXT_MATCH_DISTANCE', 0)
+    return AnswerKey(
+        quiz_id=quiz.pk,
+        version=quiz.content_version,
+        questions=questions,
+        answer_questions=answer_questions,
+        correct_answers=frozenset(correct_answers),
+        text_matchers={
+            question_id: TextMatcher(answers, distance) for question_id, answers in text_answers.items()
+        },
+        choices={question_id: tuple(options) for question_id, options in choices.items()},
+    )
+
+
+def compile_answer_key(quiz):
+    questions, answers = answer_key_querysets(quiz)
+    return build_answer_key(quiz, questions, answers)
+
+
+async def acompile_answer_key(quiz):
+    questions, answers = answer_key_querysets(quiz)
+    return build_answer_key(quiz, [row async for row in questions], [row async for row in answers])
+
+
+def get_answer_key(quiz):
+    key = _answer_keys.get(quiz.pk)
+    if key is None or key.version != quiz.content_version:
+        key = compile_answer_key(quiz)
+        _answer_keys.set(quiz.pk, key)
+    return key
+
+
+async def aget_answer_key(quiz):
+    key = _answer_keys.get(quiz.pk)
+    if key is None or key.version != quiz.content_version:
+        key = await acompile_answer_key(quiz)
+        _answer_keys.set(quiz.pk, key)
+    return key
+
+
+class InvalidSubmission(Exception):
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class ForeignAnswer(InvalidSubmission):
+    """
+    An MCQ answer id that does not belong to its question. Answers outside the
+    quiz may not exist at all, which only the database can tell, so the caller
+    picks between ``detail`` and ``missing_detail`` when ``in_quiz`` is false.
+    """
+
+    def __init__(self, question, answer_id, in_quiz):
+        super().__init__(
+            f'Invalid answer selected. Answer does not belong to question: {question.text[:50]}...'
+        )
+        self.answer_id = answer_id
+        self.in_quiz = in_quiz
+        self.missing_detail = f'Selected answer does not exist for question: {question.text[:50]}...'
+
+
+def grade_answers(answer_key, answers):
+    """
+    Grade an API ``answers`` mapping (question id -> answer) against the key.
+
+    Returns ``(score, user_answers)`` with unsaved ``UserAnswer`` objects, or
+    raises ``InvalidSubmission`` with the message for the first bad answer.
+    """
+    score = 0
+    user_answers = []
+
+    for question in answer_key.questions:
+        question_key = str(question.id)
+
+        if question_key not in answers:
+            raise InvalidSubmission(f'Please answer question: {question.text[:50]}...')
+
+        answer_value = answers[question_key]
+
+        if answer_value is None:
+            raise InvalidSubmission(f'Answer cannot be null for question: {question.text[:50]}...')
+
+        if not isinstance(answer_value, str):
+            answer_value = str(answer_value)
+
+        answer_value = answer_value.strip()
+
+        if question.question_type == "MCQ":
+            if not answer_value:
+                raise InvalidSubmission(f'Please answer question: {question.text[:50]}...')
+
+            try:
+                answer_id = int(answer_value)
+            except (ValueError, TypeError):
+                raise InvalidSubmission(
+                    f'Invalid answer format for question: {question.text[:50]}. Expected a numeric answer ID.'
+                )
+
+            if answer_id <= 0:
+                raise InvalidSubmission(
+                    f'Answer ID must be a positive integer for question: {question.text[:50]}...'
+                )
+
+            answer_question_id = answer_key.question_for(answer_id)
+            if answer_question_id != question.id:
+                raise ForeignAnswer(question, answer_id, in_quiz=answer_question_id is not None)
+
+            correct = answer_key.is_correct(answer_id)
+            if correct:
+                score += 1
+
+            user_answers.append(UserAnswer(
+                question_id=question.id,
+                answer_id=answer_id,
+                is_correct=correct,
+            ))
+        elif question.question_type == "TEXT":
+            if not answer_value:
+                raise InvalidSubmission(f'Please provide an answer for: {question.text[:50]}...')
+
+            if len(answer_value) > 1000:
+                raise InvalidSubmission(
+                    f'Text answer is too long. Maximum 1000 characters allowed for question: {question.text[:50]}...'
+                )
+
+            answer_id = answer_key.match_text(question.id, answer_value)
+            correct = answer_key.is_correct(answer_id)
+            if correct:
+                score += 1
+
+            user_answers.append(UserAnswer(
+                question_id=question.id,
+                answer_id=answer_id,
+                text=answer_value,
+                is_correct=correct,
+            ))
+        else:
+            raise InvalidSubmission(f'Unknown question type for question: {question.text[:50]}...')
+
+    return score, user_answers
+
+
+class GradedSubmission:
+    """A submission resolved against its quiz's answer key and graded, ready for ``save_submission``."""
+    __slots__ = ('quiz', 'answer_key', 'score', 'user_answers')
+
+    def __init__(self, quiz, answer_key, score, user_answers):
+        self.quiz = quiz
+        self.answer_key = answer_key
+        self.score = score
+        self.user_answers = user_answers
+
+
+def grade_with_key(quiz, answer_key, answers):
+    if not answer_key.questions:
+        raise InvalidSubmission('This quiz has no questions available.')
+    if len(answers) > len(answer_key.questions):
+        raise InvalidSubmission(
+            'Too many answers provided. Please provide answers only for questions in this quiz.'
+        )
+    score, user_answers = grade_answers(answer_key, answers)
+    return GradedSubmission(quiz, answer_key, score, user_answers)
+
+
+def grade_submission(quiz, answers):
+    """
+    Validate and grade ``answers`` for ``quiz`` in one pass over the cached
+    answer key. Raises ``InvalidSubmission`` with the API's messages; the
+    database is only consulted to word the error for an unknown answer id.
+    """
+    try:
+        return grade_with_key(quiz, get_answer_key(quiz), answers)
+    except ForeignAnswer as exc:
+        if not exc.in_quiz and not Answer.objects.filter(id=exc.answer_id).exists():
+            raise InvalidSubmission(exc.missing_detail)
+        raise
+
+
+async def agrade_submission(quiz, answers):
+    try:
+        return grade_with_key(quiz, await aget_answer_key(quiz), answers)
+    except ForeignAnswer as exc:
+        if not exc.in_quiz and not await Answer.objects.filter(id=exc.answer_id).aexists():
+            raise InvalidSubmission(exc.missing_detail)
+        raise
+
+
+class DuplicateSubmission(Exception):
+    pass
+
+
+def save_submission(quiz, user, score, user_answers):
+    """
+    Persist a fully graded submission: one INSERT for the submission (score
+    included) and one bulk INSERT for its answers, in a single transaction.
+
+    Raises ``DuplicateSubmission`` when the user already submitted this quiz;
+    the unique constraint on (quiz, user_name) is the only check, so concurrent
+    submits cannot both succeed.
+    """
+    with transaction.atomic():
+        try:
+            # One answer is recorded per question, so that is also the best possible score.
+            submission = UserSubmission.objects.create(
+                quiz=quiz, user_name=user, score=score, max_score=len(user_answers),
+            )
+        except IntegrityError:
+            raise DuplicateSubmission
+        for user_answer in user_answers:
+            user_answer.submission = submission
+        UserAnswer.objects.bulk_create(user_answers)
+        transaction.on_commit(partial(record_submission, submission))
+    return submission
@@ -0,0 +1,69 @@
+"""
+Events as an iCalendar (RFC 5545) feed.
+
+Events are read with a chunked iterator and each VEVENT is encoded as it is
+reached, so the feed is streamed rather than assembled in memory.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from .models import Event
+
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+CHUNK_SIZE = 500
+PRODID = '-//QuizEvents//Events//EN'
+
+
+def event_range(start=None, end=None):
+    """Events between the inclusive ``start`` and ``end`` dates, if given."""
+    events = Event.objects.all()
+    if start:
+        events = events.filter(date__gte=start)
+    if end:
+        events = events.filter(date__lte=end)
+    return events
+
+
+def escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Split ``line`` into CRLF-terminated pieces of at most 75 octets."""
+    pieces = []
+    current, size = '', 0
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > 75:
+            pieces.append(current)
+            # Continuation lines start with a space, which counts towards the limit.
+            current, size = ' ', 1
+        current += char
+        size += width
+    pieces.append(current)
+    return '\r\n'.join(pieces) + '\r\n'
+
+
+def vevent(event, domain):
+    stamp = event.updated_at.astimezone(dt_timezone.utc)
+    lines = (
+        'BEGIN:VEVENT',
+        f'UID:event-{event.id}@{domain}',
+        f'DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}',
+        f'DTSTART;VALUE=DATE:{event.date:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{event.date + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{escape(event.title)}',
+        f'LOCATION:{escape(event.location)}',
+        f'DESCRIPTION:{escape(event.description or "")}',
+        'END:VEVENT',
+    )
+    return ''.join(fold(line) for line in lines)
+
+
+def calendar_lines(events, domain, chunk_size=CHUNK_SIZE):
+    yield f'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n'
+    for event in events.order_by('date', 'id').iterator(chunk_size=chunk_size):
+        yield vevent(event, domain)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,187 @@
+import bisect
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import LRUCache
+from .models import Quiz, UserSubmission
+
+ENTRY_FIELDS = ('id', 'user_name_id', 'user_name__username', 'score', 'submitted_at')
+
+
+class Leaderboard:
+    """
+    Submissions of one quiz kept sorted by (score desc, submitted_at, id).
+
+    ``rank_of`` is a binary search and ``top`` a slice, so both stay cheap with
+    100k+ submissions. ``watermark`` is the highest submission id read from the
+    database; rows above it are pulled in by ``catch_up`` so every process
+    converges on the database even for submissions it did not grade itself.
+    Submissions graded locally are added straight away but do not move the
+    watermark. Ids are allocated before commit, so a submission can commit
+    after one with a higher id; ``catch_up`` therefore also re-checks the last
+    ``LEADERBOARD_RESCAN_WINDOW`` ids below the watermark for rows it has not
+    seen yet.
+    """
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self.watermark = 0
+        self.loaded_at = time.monotonic()
+        self._keys = []
+        self._entries = {}
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, submission_id, user_id, username, score, submitted_at):
+        key = (-score, submitted_at, submission_id)
+        with self._lock:
+            if submission_id in self._entries:
+                return
+            bisect.insort(self._keys, key)
+            self._entries[submission_id] = (user_id, username, score, submitted_at)
+            self._user_keys[user_id] = key
+
+    def add_rows(self, rows):
+        for submission_id, user_id, username, score, submitted_at in rows:
+            if not isinstance(submitted_at, float):
+                submitted_at = submitted_at.timestamp()
+            self.add(submission_id, user_id, username, score, submitted_at)
+
+    def catch_up(self):
+        window = getattr(settings, 'LEADERBOARD_RESCAN_WINDOW', 1000)
+        submissions = UserSubmission.objects.filter(quiz_id=self.quiz_id, id__gt=self.watermark - window)
+        if self.watermark:
+            # Most of the window is already on the board; only read full rows
+            # from the first id that is not.
+            missing = [pk for pk in submissions.values_list('id', flat=True) if pk not in self._entries]
+            if not missing:
+                return
+            submissions = submissions.filter(id__gte=min(missing))
+        rows = list(submissions.order_by('id').values_list(*ENTRY_FIELDS))
+        if rows:
+            self.add_rows(rows)
+            self.watermark = max(self.watermark, rows[-1][0])
+
+    def entry(self, key, rank):
+        user_id, username, score, submitted_at = self._entries[key[2]]
+        return {
+            'rank': rank,
+            'submission_id': key[2],
+            'user_id': user_id,
+            'user_name': username,
+            'score': score,
+            'submitted_at': datetime.datetime.fromtimestamp(submitted_at, datetime.timezone.utc),
+        }
+
+    def top(self, limit):
+        with self._lock:
+            return [self.entry(key, index + 1) for index, key in enumerate(self._keys[:limit])]
+
+    def rank_of(self, user_id):
+        with self._lock:
+            key = self._user_keys.get(user_id)
+            if key is None:
+                return None
+            return self.entry(key, bisect.bisect_left(self._keys, key) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'quiz_id': self.quiz_id,
+                'watermark': self.watermark,
+                'entries': [[key[2], *self._entries[key[2]]] for key in self._keys],
+            }
+
+
+_boards = LRUCache(maxsize=getattr(settings, 'LEADERBOARD_CACHE_SIZE', 32))
+
+
+def snapshot_path(quiz_id):
+    directory = getattr(settings, 'LEADERBOARD_SNAPSHOT_DIR', None)
+    if not directory:
+        return None
+    return os.path.join(directory, f'quiz-{quiz_id}.json')
+
+
+def load_snapshot(board):
+    path = snapshot_path(board.quiz_id)
+    if not path:
+        return
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return
+    board.add_rows(data['entries'])
+    board.watermark = data['watermark']
+
+
+def write_snapshot(board):
+    path = snapshot_path(board.quiz_id)
+    if not path:
+        return None
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(board.snapshot(), fh)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_leaderboard(quiz_id, use_snapshot=True):
+    board = Leaderboard(quiz_id)
+    if use_snapshot:
+        load_snapshot(board)
+    board.catch_up()
+    return board
+
+
+def get_leaderboard(quiz_id):
+    """
+    Return the up-to-date leaderboard of a quiz, or ``None`` if it does not exist.
+
+    Boards are reloaded from the database after ``LEADERBOARD_MAX_AGE`` seconds
+    so that edits and deletions made by other processes are eventually seen.
+    """
+    board = _boards.get(quiz_id)
+    max_age = getattr(settings, 'LEADERBOARD_MAX_AGE', 600)
+    if board is None or time.monotonic() - board.loaded_at > max_age:
+        if not Quiz.objects.filter(pk=quiz_id).exists():
+            return None
+        board = build_leaderboard(quiz_id, use_snapshot=board is None)
+        _boards.set(quiz_id, board)
+    else:
+        board.catch_up()
+    return board
+
+
+def record_submission(submission):
+    board = _boards.get(submission.quiz_id)
+    if board is not None:
+        board.add(
+            submission.id,
+            submission.user_name_id,
+            submission.user_name.username,
+            submission.score,
+            submission.submitted_at.timestamp(),
+        )
+
+
+def discard_leaderboard(quiz_id):
+    _boards.pop(quiz_id)
+    path = snapshot_path(quiz_id)
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
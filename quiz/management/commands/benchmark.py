@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.benchmarks import SCENARIOS, SIZES, run_benchmarks, throwaway_database, write_results
+
+
+class Command(BaseCommand):
+    help = "Benchmark the quiz hot paths on a throwaway database and check their query budgets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES),
+                            help="Quiz sizes (number of questions) to benchmark.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per endpoint and size.")
+        parser.add_argument('--endpoint', action='append', choices=sorted(SCENARIOS),
+                            help="Only benchmark this endpoint (repeatable).")
+        parser.add_argument('--output', default='benchmark.json', help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            results = run_benchmarks(options['sizes'], options['repeat'], options['endpoint'])
+        write_results(options['output'], results)
+
+        for row in results:
+            line = (f"{row['endpoint']:<24} n={row['questions']:<5} "
+                    f"queries={row['queries']:<4} budget={row['query_budget']:<5} "
+                    f"median={row['timings_ms']['median']:.2f}ms")
+            self.stdout.write(line if row['within_budget'] else self.style.ERROR(line))
+
+        over = [row for row in results if not row['within_budget']]
+        if over:
+            raise CommandError(f"{len(over)} benchmark(s) exceeded their query budget.")
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from quiz.benchmarks import run_auth_benchmark, throwaway_database, write_results
+
+
+class Command(BaseCommand):
+    help = "Compare per-request JWT authentication cost with and without the cached user lookup."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests authenticated per mode.")
+        parser.add_argument('--users', type=int, default=50, help="Distinct users the requests are spread over.")
+        parser.add_argument('--output', default='benchmark-auth.json', help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            results = run_auth_benchmark(options['requests'], options['users'])
+        write_results(options['output'], results)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['authentication']:<11} {row['us_per_request']:>8.1f}us/request  "
+                f"{row['queries_per_request']:.3f} queries/request"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
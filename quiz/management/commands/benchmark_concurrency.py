@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from quiz.benchmarks import run_concurrent_submits, throwaway_database, write_results
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent-submit throughput of the WSGI and ASGI stacks on a throwaway database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100, help="Number of questions in the quiz.")
+        parser.add_argument('--requests', type=int, default=200, help="Submissions sent to each stack.")
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument('--concurrency', type=int, default=50, help="ASGI requests in flight.")
+        parser.add_argument('--output', default='benchmark-concurrency.json',
+                            help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            results = run_concurrent_submits(
+                options['questions'], options['requests'], options['threads'], options['concurrency'],
+            )
+        write_results(options['output'], results)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<5} concurrency={row['concurrency']:<4} "
+                f"{row['throughput_rps']:.1f} req/s  median={row['latency_ms']['median']:.1f}ms "
+                f"p95={row['latency_ms']['p95']:.1f}ms  statuses={row['statuses']}"
+            )
+
+        if any(set(row['statuses']) != {201} for row in results):
+            # Lock contention shows up as errors rather than latency on some
+            # databases; it is part of the comparison, so report it.
+            self.stdout.write(self.style.WARNING("Some submissions were not accepted; see the status counts."))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from quiz.benchmarks import SIZES, run_render_benchmarks, throwaway_database, write_results
+
+
+class Command(BaseCommand):
+    help = "Time the quiz and event pages with the template fragment cache cold and warm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES),
+                            help="Quiz sizes (questions) and event counts to benchmark.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per page, size and cache state.")
+        parser.add_argument('--output', default='benchmark-render.json', help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            results = run_render_benchmarks(options['sizes'], options['repeat'])
+        write_results(options['output'], results)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<16} n={row['size']:<5} cold={row['cold_median_ms']:.2f}ms "
+                f"warm={row['warm_median_ms']:.2f}ms  x{row['speedup']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
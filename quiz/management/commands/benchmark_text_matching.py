@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from quiz.benchmarks import run_text_matching, write_results
+
+
+class Command(BaseCommand):
+    help = "Measure how many TEXT answers per second one core grades, exactly and with typo tolerance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50, help="TEXT questions per submission.")
+        parser.add_argument('--submissions', type=int, default=400, help="Submissions graded per tolerance.")
+        parser.add_argument('--distances', nargs='+', type=int, default=[0, 1, 2],
+                            help="Edit distance tolerances to compare.")
+        parser.add_argument('--output', default='benchmark-text.json', help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        results = run_text_matching(options['questions'], options['submissions'], options['distances'])
+
+        write_results(options['output'], results)
+
+        for row in results:
+            self.stdout.write(
+                f"distance={row['distance']}  {row['answers_per_s']:>9,} answers/s  "
+                f"matched {row['matched']}/{row['answers']}  compile={row['compile_ms']:.2f}ms"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.benchmarks import run_write_load, throwaway_database, write_results
+
+PROFILES = ('sqlite-basic', 'sqlite', 'postgres')
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test concurrent submission writes on a throwaway database. With --profiles, "
+        "runs once per database profile (QUIZ_DB_PROFILE) and compares them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=20, help="Number of questions in the quiz.")
+        parser.add_argument('--submissions', type=int, default=500, help="Submissions to write.")
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent writer threads.")
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES,
+                            help="Database profiles to compare (default: the active one).")
+        parser.add_argument('--output', default='benchmark-writes.json', help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        if options['profiles']:
+            results = [self.run_profile(profile, options) for profile in options['profiles']]
+        else:
+            results = [self.run_here(options)]
+
+        write_results(options['output'], results)
+
+        for row in results:
+            line = (f"{row['profile']:<13} {row['throughput_wps']:>8.1f} writes/s  "
+                    f"median={row['latency_ms']['median']}ms  written={row['submissions']}")
+            if row['errors']:
+                line += f"  errors={sum(row['errors'].values())}"
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_here(self, options):
+        with throwaway_database():
+            return run_write_load(options['questions'], options['submissions'], options['threads'])
+
+    def run_profile(self, profile, options):
+        # Settings are fixed at startup, so each profile gets its own process.
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            command = [
+                sys.executable, '-m', 'django', 'benchmark_writes',
+                '--questions', str(options['questions']),
+                '--submissions', str(options['submissions']),
+                '--threads', str(options['threads']),
+                '--output', output.name,
+            ]
+            env = dict(os.environ, QUIZ_DB_PROFILE=profile)
+            try:
+                subprocess.run(command, env=env, cwd=settings.BASE_DIR, check=True, stdout=subprocess.DEVNULL)
+            except subprocess.CalledProcessError:
+                raise CommandError(f"The {profile!r} profile failed to run.")
+            with open(output.name) as fh:
+                return json.load(fh)['results'][0]
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.deletion import CHUNK_SIZE, delete_quiz, hide_quizzes
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Delete quizzes and everything under them in small chunks, reporting progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to delete.")
+        parser.add_argument(
+            '--hidden', action='store_true',
+            help="Also finish every quiz hidden by the admin or left hidden by an interrupted deletion.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows deleted per transaction.")
+        parser.add_argument(
+            '--watch', action='store_true',
+            help="Keep running and delete quizzes as the admin hides them (implies --hidden).",
+        )
+        parser.add_argument('--poll', type=float, default=5.0, help="Seconds to sleep between checks with --watch.")
+
+    def handle(self, *args, **options):
+        quiz_ids = set(Quiz.all_objects.filter(id__in=options['quiz_ids']).values_list('id', flat=True))
+        missing = set(options['quiz_ids']) - quiz_ids
+        if missing:
+            raise CommandError(f"No quiz with id {', '.join(map(str, sorted(missing)))}.")
+        if options['watch']:
+            self.delete(quiz_ids, options['chunk_size'])
+            while True:
+                self.delete(self.hidden(), options['chunk_size'])
+                time.sleep(options['poll'])
+        if options['hidden']:
+            quiz_ids.update(self.hidden())
+        if not quiz_ids:
+            raise CommandError("Give the quizzes to delete, or --hidden.")
+        self.delete(quiz_ids, options['chunk_size'])
+
+    def hidden(self):
+        return set(Quiz.all_objects.filter(is_hidden=True).values_list('id', flat=True))
+
+    def delete(self, quiz_ids, chunk_size):
+        if not quiz_ids:
+            return
+        # Hide them all up front so none stays visible while the others are deleted.
+        hide_quizzes(quiz_ids)
+        for quiz_id in sorted(quiz_ids):
+            def progress(model, deleted):
+                self.stdout.write(f"Quiz {quiz_id}: {deleted} {model._meta.verbose_name_plural} deleted")
+
+            delete_quiz(quiz_id, chunk_size, progress)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {len(quiz_ids)} quiz(zes)."))
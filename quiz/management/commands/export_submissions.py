@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.export import CHUNK_SIZE, FORMATS, export_lines, export_queryset, export_rows, parse_bound
+
+
+class Command(BaseCommand):
+    help = "Stream submissions and their answers as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help="Only this quiz.")
+        parser.add_argument('--since', help="Submitted at or after this date/datetime.")
+        parser.add_argument('--until', help="Submitted before this datetime, or on or before this date.")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv', dest='fmt')
+        parser.add_argument('--output', '-o', help="File to write to (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched per round trip.")
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_bound(options['since']) if options['since'] else None
+            until = parse_bound(options['until'], end=True) if options['until'] else None
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        rows = export_rows(export_queryset(options['quiz'], since, until), options['chunk_size'])
+        lines = export_lines(rows, options['fmt'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from quiz.submission_queue import process_batch
+
+
+class Command(BaseCommand):
+    help = "Grade queued quiz submissions in batches (run one or more of these in queued mode)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Tickets graded per transaction.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                processed = process_batch(options['batch_size'])
+            except OperationalError as exc:
+                # Another writer held the database lock for too long; retry the batch.
+                self.stderr.write(f"Batch failed, retrying: {exc}")
+                processed = 0
+            if processed:
+                self.stdout.write(f"Processed {processed} submission(s).")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll'])
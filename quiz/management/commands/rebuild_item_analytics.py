@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from quiz.analytics import refresh_analytics
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Recompute per-question and per-answer statistics from the submitted answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to rebuild (default: all).")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('id')
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(id__in=options['quiz_ids'])
+
+        for quiz_id in quizzes.values_list('id', flat=True):
+            state = refresh_analytics(quiz_id, rebuild=True)
+            self.stdout.write(f"Quiz {quiz_id}: up to submission {state.watermark}")
+
+        self.stdout.write(self.style.SUCCESS("Item analytics rebuilt."))
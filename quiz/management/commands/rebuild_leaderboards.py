@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from quiz.leaderboard import build_leaderboard, write_snapshot
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Rebuild quiz leaderboards from the database and write their snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to rebuild (default: all).")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('id')
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(id__in=options['quiz_ids'])
+
+        for quiz_id in quizzes.values_list('id', flat=True):
+            board = build_leaderboard(quiz_id, use_snapshot=False)
+            path = write_snapshot(board)
+            self.stdout.write(f"Quiz {quiz_id}: {len(board)} submissions" + (f" -> {path}" if path else ""))
+
+        self.stdout.write(self.style.SUCCESS("Leaderboards rebuilt."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from quiz.counters import repair_counters
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Recompute the question, submission and score counters stored on quizzes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to repair (default: all).")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('id')
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(id__in=options['quiz_ids'])
+
+        repaired = repair_counters(quizzes)
+        for quiz in repaired:
+            self.stdout.write(
+                f"Quiz {quiz.id}: {quiz.question_count} questions, "
+                f"{quiz.submission_count} submissions, score sum {quiz.score_sum}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(repaired)} quiz(zes) repaired."))
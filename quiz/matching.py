@@ -0,0 +1,88 @@
+"""
+Grading of free-text answers.
+
+Accepted texts are normalized once, when a quiz's answer key is compiled, so
+grading an answer is one normalization plus a set lookup. Punctuation is only
+ignored when that still points at a single answer, so ``C``, ``C#`` and
+``C++`` stay apart. An optional edit distance (``QUIZ_TEXT_MATCH_DISTANCE``)
+tolerates typos; it is capped at a quarter of the accepted text's length so
+short answers still need to be exact.
+"""
+import re
+import unicodedata
+
+_PUNCTUATION = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Case-fold, NFKC-normalize, and reduce whitespace runs to single spaces."""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+def strip_punctuation(key):
+    """A ``normalize``d key with punctuation runs also reduced to single spaces."""
+    return _PUNCTUATION.sub(' ', key).strip()
+
+
+def within_distance(a, b, limit):
+    """Whether the Levenshtein distance between ``a`` and ``b`` is at most ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char in enumerate(b, 1):
+        current = [i]
+        best = i
+        for j, other in enumerate(a, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            current.append(cost)
+            best = min(best, cost)
+        if best > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class TextMatcher:
+    """The answers of one TEXT question, keyed by their normalized text."""
+
+    __slots__ = ('exact', 'loose', 'fuzzy')
+
+    def __init__(self, answers, distance=0):
+        rows = {}
+        for answer_id, text, is_correct in answers:
+            key = normalize(text)
+            if not key:
+                continue
+            # A text shared by a correct and an incorrect answer is not a correct match.
+            if key not in rows or (rows[key][1] and not is_correct):
+                rows[key] = (answer_id, is_correct)
+        self.exact = {key: answer_id for key, (answer_id, _) in rows.items()}
+
+        candidates = {}
+        for key, answer_id in self.exact.items():
+            loose = strip_punctuation(key)
+            if loose:
+                candidates.setdefault(loose, []).append(answer_id)
+        self.loose = {key: ids[0] for key, ids in candidates.items() if len(ids) == 1}
+
+        self.fuzzy = tuple(
+            (text, answer_id, min(distance, len(text) // 4))
+            for text, answer_id in self.exact.items()
+            if distance and len(text) >= 4
+        )
+
+    def match(self, text):
+        """The id of the answer ``text`` matches, or ``None``."""
+        text = normalize(text)
+        if not text:
+            return None
+        answer_id = self.exact.get(text)
+        if answer_id is None:
+            answer_id = self.loose.get(strip_punctuation(text))
+        if answer_id is None:
+            for accepted, candidate, limit in self.fuzzy:
+                if within_distance(text, accepted, limit):
+                    return candidate
+        return answer_id
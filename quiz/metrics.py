@@ -0,0 +1,116 @@
+import bisect
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(
+                        f'{self.name}_bucket{format_labels(self.labelnames, labels, [("le", le)])} {cumulative}'
+                    )
+                label_text = format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {total}')
+                lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+ENDPOINT_LABELS = ('view', 'method')
+
+REQUESTS = Counter(
+    'quiz_http_requests_total', 'HTTP requests handled.', ENDPOINT_LABELS + ('status',),
+)
+REQUEST_DURATION = Histogram(
+    'quiz_http_request_duration_seconds', 'Wall time spent handling a request.', ENDPOINT_LABELS,
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_DURATION = Histogram(
+    'quiz_http_request_db_duration_seconds', 'Time spent in SQL per request.', ENDPOINT_LABELS,
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES = Histogram(
+    'quiz_http_request_db_queries', 'SQL queries executed per request.', ENDPOINT_LABELS,
+    (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000),
+)
+
+REGISTRY = (REQUESTS, REQUEST_DURATION, DB_DURATION, DB_QUERIES)
+
+
+def observe_request(view, method, status, duration, db_duration, db_queries):
+    labels = (view, method)
+    REQUESTS.inc(labels + (str(status),))
+    REQUEST_DURATION.observe(labels, duration)
+    DB_DURATION.observe(labels, db_duration)
+    DB_QUERIES.observe(labels, db_queries)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    user = getattr(request, 'user', None)
+    if request.META.get('REMOTE_ADDR') not in allowed and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
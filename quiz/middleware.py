@@ -0,0 +1,106 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_SQL = 500
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook that counts and times queries, keeping only the slowest."""
+
+    def __init__(self, keep=5):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, (elapsed, self.count, sql))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, self.count, sql))
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, SQL count and SQL time for every request, exposes them
+    in a ``Server-Timing`` header and the ``/metrics`` histograms, and logs
+    requests slower than ``SLOW_REQUEST_THRESHOLD_MS`` with their slowest queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500) / 1000
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def install(stack, recorder):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.install(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # Connections are per thread, and under ASGI the request's ORM calls
+        # run in its thread-sensitive worker thread, so the wrappers are
+        # installed (and removed) there rather than on the event loop.
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    def finish(self, request, response, recorder, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        observe_request(view, request.method, response.status_code, duration, recorder.duration, recorder.count)
+
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+            f'total;dur={duration * 1000:.1f}'
+        )
+
+        if duration >= self.threshold:
+            slowest = '\n'.join(
+                f'  {elapsed * 1000:.1f}ms {sql[:MAX_LOGGED_SQL]}'
+                for elapsed, _, sql in sorted(recorder.slowest, reverse=True)
+            )
+            logger.warning(
+                'Slow request %s %s (%s): %.1fms, %d queries in %.1fms\n%s',
+                request.method, request.path, view, duration * 1000,
+                recorder.count, recorder.duration * 1000, slowest,
+            )
+        return response
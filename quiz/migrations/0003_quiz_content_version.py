@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_alter_usersubmission_user_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='question',
+            unique_together={('quiz', 'text')},
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:51
+
+from django.conf import settings
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_submissions(apps, schema_editor):
+    # Which of a user's submissions to keep is not ours to decide, and the
+    # answers would go with the rest, so list them for an admin instead.
+    UserSubmission = apps.get_model('quiz', 'UserSubmission')
+    duplicates = (
+        UserSubmission.objects.values('quiz_id', 'user_name_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by('quiz_id', 'user_name_id')
+    )
+    conflicts = []
+    for row in duplicates:
+        ids = UserSubmission.objects.filter(
+            quiz_id=row['quiz_id'], user_name_id=row['user_name_id'],
+        ).order_by('id').values_list('id', flat=True)
+        conflicts.append(
+            f"quiz {row['quiz_id']}, user {row['user_name_id']}: submissions {', '.join(map(str, ids))}"
+        )
+    if conflicts:
+        raise IntegrityError(
+            'Each user may only submit a quiz once. Delete all but one submission of each of '
+            'these groups, then migrate again:\n' + '\n'.join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_quiz_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_submissions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usersubmission',
+            constraint=models.UniqueConstraint(fields=('quiz', 'user_name'), name='unique_submission_per_user'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    # Existing submissions are assumed to have been out of today's question count.
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+    UserSubmission = apps.get_model('quiz', 'UserSubmission')
+
+    def per_quiz(queryset, aggregate):
+        return Coalesce(
+            Subquery(queryset.filter(quiz=OuterRef('pk')).values('quiz').annotate(v=aggregate).values('v')),
+            Value(0),
+        )
+
+    Quiz.objects.update(
+        question_count=per_quiz(Question.objects.all(), Count('id')),
+        submission_count=per_quiz(UserSubmission.objects.all(), Count('id')),
+        score_sum=per_quiz(UserSubmission.objects.all(), Sum('score')),
+    )
+    UserSubmission.objects.update(
+        max_score=Subquery(Quiz.objects.filter(pk=OuterRef('quiz')).values('question_count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_queuedsubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='score_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='submission_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='usersubmission',
+            name='max_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
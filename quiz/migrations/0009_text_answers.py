@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_item_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranswer',
+            name='text',
+            field=models.CharField(blank=True, max_length=1000),
+        ),
+        migrations.AlterField(
+            model_name='useranswer',
+            name='answer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='quiz.answer'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# auth.User belongs to another app, so its constraints cannot be declared on
+# the model; they are created (and dropped) here through the schema editor.
+CONSTRAINTS = [
+    models.UniqueConstraint(Lower('username'), name='unique_user_username_lower'),
+    # Accounts created without an email (e.g. by createsuperuser) share ''.
+    models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='unique_user_email_lower'),
+]
+
+
+def check_conflicts(apps, schema_editor):
+    # Accounts can't be merged automatically, so list them for an admin to
+    # rename before the constraints are added.
+    User = apps.get_model('auth', 'User')
+    conflicts = []
+    for field, users in (('username', User.objects.all()), ('email', User.objects.exclude(email=''))):
+        duplicates = (
+            users.annotate(key=Lower(field)).values('key')
+            .annotate(total=Count('id')).filter(total__gt=1).values_list('key', flat=True)
+        )
+        for key in duplicates:
+            clashing = users.annotate(key=Lower(field)).filter(key=key).order_by('id')
+            conflicts.append(', '.join(f'{getattr(user, field)!r} (id {user.id})' for user in clashing))
+    if conflicts:
+        raise IntegrityError(
+            'Usernames and emails must be unique ignoring case. Rename or remove one of each '
+            'of these accounts, then migrate again:\n' + '\n'.join(conflicts)
+        )
+
+
+def add_constraints(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for constraint in CONSTRAINTS:
+        schema_editor.add_constraint(User, constraint)
+
+
+def remove_constraints(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for constraint in CONSTRAINTS:
+        schema_editor.remove_constraint(User, constraint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('quiz', '0009_text_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_conflicts, migrations.RunPython.noop),
+        migrations.RunPython(add_constraints, remove_constraints),
+    ]
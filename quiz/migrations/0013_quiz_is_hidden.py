@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='is_hidden',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
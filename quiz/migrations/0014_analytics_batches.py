@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def discard_analytics(apps, schema_editor):
+    # Existing statistics were tracked by id watermark; every submission now
+    # starts out pending, so drop them and let the next refresh rebuild.
+    apps.get_model('quiz', 'QuizAnalytics').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_quiz_is_hidden'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizanalytics',
+            name='batch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usersubmission',
+            name='analytics_batch',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='usersubmission',
+            index=models.Index(fields=['quiz', 'analytics_batch'], name='submission_analytics_batch'),
+        ),
+        migrations.RunPython(discard_analytics, migrations.RunPython.noop),
+    ]
@@ -4,18 +4,54 @@ from django.db import models
 
 # Create your models here.
 
+class VisibleQuizManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_hidden=False)
+
+
+class LoadedParentMixin:
+    """
+    Remembers the ``parent_field`` value read from the database, so the
+    signals can tell when a row is moved to another parent.
+    """
+    parent_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_parent_id = instance.__dict__.get(cls.parent_field)
+        return instance
+
+
 class Quiz(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained on write (see quiz.signals and quiz.counters); `manage.py
+    # repair_quiz_counters` recomputes them from the rows.
+    question_count = models.PositiveIntegerField(default=0, editable=False)
+    submission_count = models.PositiveIntegerField(default=0, editable=False)
+    score_sum = models.BigIntegerField(default=0, editable=False)
+    # Set while the quiz is being deleted in chunks (see quiz.deletion).
+    is_hidden = models.BooleanField(default=False, editable=False)
+
+    # Hidden quizzes are gone as far as the site and the API are concerned.
+    objects = VisibleQuizManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
 
+    @property
+    def average_score(self):
+        return self.score_sum / self.submission_count if self.submission_count else None
 
-class Question(models.Model):
+
+class Question(LoadedParentMixin, models.Model):
+    parent_field = 'quiz_id'
     QUESTION_TYPES = (
         ('MCQ', 'Multiple Choice'),
         ('TEXT', 'Text Input'),
@@ -33,7 +69,8 @@ class Question(models.Model):
 
 
 
-class Answer(models.Model):
+class Answer(LoadedParentMixin, models.Model):
+    parent_field = 'question_id'
     id = models.AutoField(primary_key=True)
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="answers")
     text = models.CharField(max_length=255)
@@ -48,7 +85,16 @@ class UserSubmission(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="submissions")
     user_name = models.ForeignKey(User, on_delete=models.CASCADE,related_name='user_name')
     score = models.IntegerField(default=0)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    max_score = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # The item analytics refresh that folded this submission in; NULL until then.
+    analytics_batch = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'user_name'], name='unique_submission_per_user'),
+        ]
+        indexes = [models.Index(fields=['quiz', 'analytics_batch'], name='submission_analytics_batch')]
 
     def __str__(self):
         return f"{self.user_name} - {self.quiz.title}"
@@ -57,7 +103,9 @@ class UserSubmission(models.Model):
 class UserAnswer(models.Model):
     submission = models.ForeignKey(UserSubmission, on_delete=models.CASCADE, related_name="user_answers")
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
-    answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
+    # For TEXT questions, the answer the text matched (if any) and the text itself.
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, null=True, blank=True)
+    text = models.CharField(max_length=1000, blank=True)
     is_correct = models.BooleanField(default=False)
 
     def __str__(self):
@@ -70,6 +118,101 @@ class Event(models.Model):
     description = models.TextField(blank=True, null=True)
     date = models.DateField()
     location = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Serves date range filters and keyset pagination over (date, id).
+        indexes = [models.Index(fields=['date', 'id'], name='event_date_id')]
 
     def __str__(self):
         return self.title
+
+
+class QueuedSubmission(models.Model):
+    """A submit request accepted in queued mode, waiting to be graded by ``process_submissions``."""
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    id = models.AutoField(primary_key=True)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="queued_submissions")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="queued_submissions")
+    answers = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING, db_index=True)
+    detail = models.CharField(max_length=255, blank=True)
+    submission = models.ForeignKey(UserSubmission, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Ticket {self.id} ({self.status})"
+
+
+class QuizAnalytics(models.Model):
+    """How far the item statistics of a quiz have been folded in (see ``quiz.analytics``)."""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name="analytics")
+    # The last refresh; submissions it folded in carry this number.
+    batch = models.PositiveIntegerField(default=0)
+    # Highest submission id folded in so far, for display.
+    watermark = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "quiz analytics"
+
+    def __str__(self):
+        return f"Analytics for {self.quiz_id} (up to submission {self.watermark})"
+
+
+class QuestionStats(models.Model):
+    """
+    Running sums over the answers given to one question. ``score_*`` are sums
+    of the total score of the submissions the answers belong to, which is
+    enough to derive the item-rest correlation without revisiting the rows.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="question_stats")
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_squares = models.BigIntegerField(default=0)
+    correct_score_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "question stats"
+
+    def __str__(self):
+        return f"Stats for question {self.question_id}"
+
+    @property
+    def percent_correct(self):
+        return 100 * self.correct / self.attempts if self.attempts else None
+
+    @property
+    def discrimination(self):
+        """
+        Correlation between answering this question correctly and the score on
+        the rest of the quiz; ``None`` until both vary.
+        """
+        n, x = self.attempts, self.correct
+        rest = self.score_sum - x
+        rest_squares = self.score_squares - 2 * self.correct_score_sum + x
+        covariance = n * (self.correct_score_sum - x) - x * rest
+        variance = (n * x - x * x) * (n * rest_squares - rest * rest)
+        return covariance / variance ** 0.5 if variance > 0 else None
+
+
+class AnswerStats(models.Model):
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="answer_stats")
+    picks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "answer stats"
+
+    def __str__(self):
+        return f"Stats for answer {self.answer_id}"
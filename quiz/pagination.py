@@ -0,0 +1,121 @@
+from base64 import b64decode, b64encode
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class SubmissionCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class EventKeysetPagination(BasePagination):
+    """
+    Forward-only pages of events ordered by ``(date, id)``.
+
+    ``CursorPagination`` positions on the first ordering field and skips ties
+    with an offset; here the cursor is the last ``(date, id)`` seen, so every
+    page is one range scan of the ``event_date_id`` index.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            date, pk = position
+            queryset = queryset.filter(Q(date__gt=date) | Q(date=date, id__gt=pk))
+        events = list(queryset.order_by('date', 'id')[:page_size + 1])
+        self.next_position = None
+        if len(events) > page_size:
+            events = events[:page_size]
+            self.next_position = (events[-1].date, events[-1].id)
+        return events
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            date, pk = b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            date, pk = parse_date(date), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date, pk
+
+    def encode_cursor(self, position):
+        date, pk = position
+        encoded = b64encode(f'{date.isoformat()}|{pk}'.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_position) if self.next_position else None
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def estimated_count(model, using='default'):
+    """A cheap estimate of the number of rows in ``model``'s table, or ``None``."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table has been vacuumed or analyzed.
+        return row[0] if row and row[0] >= 0 else None
+    # The highest primary key is one index lookup; it overcounts once rows are deleted.
+    return model._base_manager.using(using).aggregate(highest=Max('pk'))['highest'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator that skips ``COUNT(*)`` on large unfiltered tables.
+
+    Once the estimate reaches ``QUIZ_ADMIN_ESTIMATE_THRESHOLD`` rows it is
+    used as the count. Filtered changelists are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, 'QUIZ_ADMIN_ESTIMATE_THRESHOLD', 100000):
+                return estimate
+        return super().count
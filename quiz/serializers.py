@@ -3,6 +3,11 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 import re
+from django.db import IntegrityError, transaction
+from .accounts import DuplicateAccount, create_account, duplicate_account
+from .export import parse_bound
+from .grading import InvalidSubmission, grade_submission
+from .signals import bump_content_version
 from .models import Quiz, Question, Answer, UserSubmission, UserAnswer, Event
 
 
@@ -14,6 +19,8 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'email', 'password', 'password_2']
+        # Uniqueness (in any case) is left to the database; see create() and update().
+        extra_kwargs = {'username': {'validators': []}}
 
     def validate_username(self, value):
         if not value:
@@ -30,9 +37,6 @@ class RegisterSerializer(serializers.ModelSerializer):
         if not re.match(r'^[a-zA-Z0-9_]+$', value):
             raise serializers.ValidationError("Username can only contain letters, numbers, and underscores.")
 
-        if User.objects.filter(username__iexact=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-
         return value
 
     def validate_email(self, value):
@@ -48,9 +52,6 @@ class RegisterSerializer(serializers.ModelSerializer):
         if not re.match(email_pattern, value):
             raise serializers.ValidationError("Please enter a valid email address.")
 
-        if User.objects.filter(email__iexact=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-
         return value
 
     def validate_password(self, value):
@@ -92,14 +93,18 @@ class RegisterSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        validated_data.pop('password_2')
-        user = User.objects.create(
-            username=validated_data['username'],
-            email=validated_data['email'],
-        )
-        user.set_password(validated_data['password'])
-        user.save()
-        return user
+        try:
+            return create_account(validated_data['username'], validated_data['email'], validated_data['password'])
+        except DuplicateAccount as exc:
+            raise serializers.ValidationError({exc.field: [exc.message]})
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            exc = duplicate_account(validated_data.get('username', instance.username), exclude=instance.pk)
+            raise serializers.ValidationError({exc.field: [exc.message]})
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -141,13 +146,36 @@ class UserAnswerSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class UserSubmissionSerializer(serializers.ModelSerializer):
-    user_answers = UserAnswerSerializer(many=True, read_only=True)
-    quiz = QuizSerializer(read_only=True)
+class SparseFieldsMixin:
+    """
+    Lets callers trim a serializer with ``fields`` and opt into heavy nested
+    representations listed in ``Meta.expandable_fields`` with ``expand``.
+    """
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None) or ()
+        super().__init__(*args, **kwargs)
+
+        for name, (field_class, field_kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                self.fields[name] = field_class(**field_kwargs)
+            elif name not in self.Meta.fields:
+                self.fields.pop(name, None)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserSubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = UserSubmission
-        fields = ["id", "quiz", "user_name", "score", "submitted_at", "user_answers"]
+        fields = ["id", "quiz", "user_name", "score", "submitted_at"]
+        expandable_fields = {
+            "quiz": (QuizSerializer, {"read_only": True}),
+            "user_answers": (UserAnswerSerializer, {"many": True, "read_only": True}),
+        }
 
 
 class EventSerializer(serializers.ModelSerializer):
@@ -370,7 +398,135 @@ class EventCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class QuizSubmissionSerializer(serializers.Serializer):
+class BulkAnswerSerializer(AnswerCreateSerializer):
+    question_id = None
+
+    class Meta(AnswerCreateSerializer.Meta):
+        fields = ['text', 'is_correct']
+
+    def validate(self, data):
+        # Correct-answer rules are checked for the whole document at once.
+        return data
+
+
+class BulkQuestionSerializer(QuestionCreateSerializer):
+    quiz_id = None
+    answers = BulkAnswerSerializer(many=True, required=False)
+
+    class Meta(QuestionCreateSerializer.Meta):
+        fields = ['text', 'question_type', 'answers']
+
+    def validate(self, attrs):
+        # Duplicates are checked against the rest of the document instead.
+        return attrs
+
+
+class QuizDocumentSerializer(QuizCreateSerializer):
+    """
+    A whole quiz (questions and their answers) validated in memory and written
+    with bulk inserts in one transaction.
+    """
+    MAX_QUESTIONS = 1000
+
+    questions = BulkQuestionSerializer(many=True, allow_empty=False, max_length=MAX_QUESTIONS)
+
+    class Meta(QuizCreateSerializer.Meta):
+        fields = ['title', 'description', 'questions']
+
+    def validate(self, attrs):
+        errors = {}
+        seen_questions = {}
+        for i, question in enumerate(attrs['questions']):
+            key = question['text'].casefold()
+            if key in seen_questions:
+                errors[f'questions[{i}].text'] = [
+                    f"This question already exists for this quiz (same as questions[{seen_questions[key]}])."
+                ]
+            else:
+                seen_questions[key] = i
+
+            if question.get('question_type', 'MCQ') == 'MCQ':
+                correct = [j for j, answer in enumerate(question.get('answers', [])) if answer.get('is_correct')]
+                for j in correct[1:]:
+                    errors[f'questions[{i}].answers[{j}].is_correct'] = [
+                        "This question already has a correct answer. MCQ questions should have only one correct answer."
+                    ]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        documents = validated_data.pop('questions')
+        with transaction.atomic():
+            quiz = Quiz.objects.create(**validated_data)
+            questions = Question.objects.bulk_create(
+                Question(quiz=quiz, text=document['text'], question_type=document.get('question_type', 'MCQ'))
+                for document in documents
+            )
+            Answer.objects.bulk_create(
+                Answer(question=question, text=answer['text'], is_correct=answer.get('is_correct', False))
+                for question, document in zip(questions, documents)
+                for answer in document.get('answers', [])
+            )
+            # bulk_create sends no signals.
+            bump_content_version(Quiz.objects.filter(pk=quiz.pk), question_count=len(questions))
+        quiz.refresh_from_db()
+        return quiz
+
+
+class BoundField(serializers.Field):
+    """A ``since``/``until`` bound, parsed by ``export.parse_bound``."""
+    default_error_messages = {'invalid': 'Enter a valid date or date and time.'}
+
+    def __init__(self, end=False, **kwargs):
+        self.end = end
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return parse_bound(str(data), end=self.end)
+        except ValueError:
+            self.fail('invalid')
+
+
+class SubmissionExportQuerySerializer(serializers.Serializer):
+    quiz = serializers.IntegerField(required=False)
+    since = BoundField(required=False)
+    until = BoundField(end=True, required=False)
+
+
+class EventRangeQuerySerializer(serializers.Serializer):
+    """Inclusive ``from``/``to`` dates; ``from`` can't be a class attribute."""
+
+    def get_fields(self):
+        return {'from': serializers.DateField(required=False), 'to': serializers.DateField(required=False)}
+
+
+def error_paths(detail, prefix=''):
+    """Flatten nested serializer errors into ``{'path': ..., 'message': ...}`` items."""
+    if isinstance(detail, dict):
+        items = []
+        for key, value in detail.items():
+            if key == 'non_field_errors':
+                path = prefix
+            elif prefix:
+                path = f'{prefix}.{key}'
+            else:
+                path = key
+            items.extend(error_paths(value, path))
+        return items
+    if isinstance(detail, list) and any(isinstance(item, (dict, list)) for item in detail):
+        items = []
+        for index, item in enumerate(detail):
+            items.extend(error_paths(item, f'{prefix}[{index}]'))
+        return items
+    if isinstance(detail, list):
+        return [{'path': prefix, 'message': str(message)} for message in detail]
+    return [{'path': prefix, 'message': str(detail)}]
+
+
+class SubmissionShapeSerializer(serializers.Serializer):
+    """The shape of a submit request; runs no queries, so async views can use it too."""
     quiz_id = serializers.IntegerField()
     answers = serializers.DictField(
         child=serializers.CharField(allow_blank=False),
@@ -387,11 +543,6 @@ class QuizSubmissionSerializer(serializers.Serializer):
         if value <= 0:
             raise serializers.ValidationError("Quiz ID must be a positive integer.")
 
-        try:
-            quiz = Quiz.objects.get(id=value)
-        except Quiz.DoesNotExist:
-            raise serializers.ValidationError("Quiz does not exist.")
-
         return value
 
     def validate_answers(self, value):
@@ -403,84 +554,63 @@ class QuizSubmissionSerializer(serializers.Serializer):
 
         return value
 
-    def validate(self, data):
-        quiz_id = data.get('quiz_id')
-        answers = data.get('answers', {})
-
-        if not quiz_id:
-            raise serializers.ValidationError("Quiz ID is required.")
-
-        if not answers:
-            raise serializers.ValidationError("Answers are required.")
-
-        try:
-            quiz = Quiz.objects.get(id=quiz_id)
-        except Quiz.DoesNotExist:
-            raise serializers.ValidationError("Quiz does not exist.")
-
-        if not quiz.questions.exists():
-            raise serializers.ValidationError("This quiz has no questions available.")
-
-        quiz_questions = quiz.questions.all()
-        question_ids = set(str(q.id) for q in quiz_questions)
-        answer_keys = set(answers.keys())
-
-        if len(answers) > len(quiz_questions):
-            raise serializers.ValidationError(
-                "Too many answers provided. Please provide answers only for questions in this quiz.")
-
-        for question in quiz_questions:
-            question_key = str(question.id)
-            if question_key not in answers:
-                raise serializers.ValidationError(f"Please answer question: {question.text[:50]}...")
-
-            answer_value = answers[question_key]
-
-            if answer_value is None:
-                raise serializers.ValidationError(f"Answer cannot be null for question: {question.text[:50]}...")
 
-            if not isinstance(answer_value, str):
-                raise serializers.ValidationError(f"Answer must be a string for question: {question.text[:50]}...")
+QUIZ_MISSING = "Quiz does not exist."
 
-            answer_value = answer_value.strip()
 
-            if question.question_type == 'MCQ':
-                # Validate MCQ answer
-                if not answer_value or answer_value == '':
-                    raise serializers.ValidationError(f"Please answer question: {question.text[:50]}...")
+class SubmissionPayloadSerializer(SubmissionShapeSerializer):
+    """The shape of a submit request and its quiz, without checking answers against the quiz."""
 
-                try:
-                    answer_id = int(answer_value)
-                except (ValueError, TypeError):
-                    raise serializers.ValidationError(
-                        f"Invalid answer format for question: {question.text[:50]}. Expected a numeric answer ID.")
-
-                if answer_id <= 0:
-                    raise serializers.ValidationError(
-                        f"Answer ID must be a positive integer for question: {question.text[:50]}...")
-
-                try:
-                    selected_answer = Answer.objects.get(id=answer_id)
-                except Answer.DoesNotExist:
-                    raise serializers.ValidationError(
-                        f"Selected answer does not exist for question: {question.text[:50]}...")
+    def validate_quiz_id(self, value):
+        value = super().validate_quiz_id(value)
+        # Kept for validate(), so the quiz row is read once per request.
+        self.quiz = Quiz.objects.filter(id=value).first()
+        if self.quiz is None:
+            raise serializers.ValidationError(QUIZ_MISSING)
+        return value
 
-                if selected_answer.question != question:
-                    raise serializers.ValidationError(
-                        f"Invalid answer selected. Answer does not belong to question: {question.text[:50]}...")
 
-            elif question.question_type == 'TEXT':
-                if not answer_value or answer_value == '':
-                    raise serializers.ValidationError(f"Please provide an answer for: {question.text[:50]}...")
+class QuizSubmissionSerializer(SubmissionPayloadSerializer):
+    """
+    Validates and grades a submission in one pass; ``validated_data['submission']``
+    is the ``GradedSubmission`` to save.
+    """
 
-                if len(answer_value) > 1000:
-                    raise serializers.ValidationError(
-                        f"Text answer is too long. Maximum 1000 characters allowed for question: {question.text[:50]}...")
+    def validate(self, data):
+        try:
+            data['submission'] = grade_submission(self.quiz, data['answers'])
+        except InvalidSubmission as exc:
+            raise serializers.ValidationError(exc.detail)
+        return data
 
-                if len(answer_value) < 1:
-                    raise serializers.ValidationError(
-                        f"Text answer cannot be empty for question: {question.text[:50]}...")
-            else:
-                raise serializers.ValidationError(f"Unknown question type for question: {question.text[:50]}...")
 
-        return data
+def submitted_submission_data(submission, graded):
+    """
+    The expanded ``UserSubmissionSerializer`` payload for a submission just
+    saved, built from its answer key and rows instead of reading them back.
+    """
+    data = UserSubmissionSerializer(submission).data
+    data['quiz'] = answer_key_quiz_data(graded.quiz, graded.answer_key)
+    data['user_answers'] = UserAnswerSerializer(graded.user_answers, many=True).data
+    return data
+
+
+def answer_key_quiz_data(quiz, answer_key):
+    """``QuizSerializer(quiz).data`` rebuilt from the quiz's answer key, without queries."""
+    return {
+        'id': quiz.id,
+        'title': quiz.title,
+        'description': quiz.description,
+        'questions': [
+            {
+                'id': question.id,
+                'text': question.text,
+                'question_type': question.question_type,
+                'answers': [
+                    {'id': answer_id, 'text': text, 'is_correct': answer_key.is_correct(answer_id)}
+                    for answer_id, text in answer_key.choices.get(question.id, ())
+                ],
+            }
+            for question in answer_key.questions
+        ],
+    }
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .analytics import discard_analytics
+from .authentication import forget_user
+from .counters import add_submissions, repair_counters
+from .leaderboard import discard_leaderboard
+from .models import Quiz, Question, Answer, UserSubmission
+
+
+def bump_content_version(quizzes, **changes):
+    """Invalidate everything cached against the content of ``quizzes``."""
+    quizzes.update(content_version=F('content_version') + 1, updated_at=timezone.now(), **changes)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'loaded_parent_id', None)
+    instance.loaded_parent_id = instance.quiz_id
+    moved = previous is not None and previous != instance.quiz_id
+    if moved:
+        # The quiz it left has changed too.
+        bump_content_version(
+            Quiz.objects.filter(pk=previous), question_count=Greatest(F('question_count') - 1, 0),
+        )
+    changes = {'question_count': F('question_count') + 1} if created or moved else {}
+    bump_content_version(Quiz.objects.filter(pk=instance.quiz_id), **changes)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    # Counters only drift through bulk writes that skip signals; never let
+    # such drift turn a deletion into a constraint error.
+    bump_content_version(
+        Quiz.objects.filter(pk=instance.quiz_id),
+        question_count=Greatest(F('question_count') - 1, 0),
+    )
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    # An answer moved to another question may have left another quiz too.
+    question_ids = {instance.question_id, getattr(instance, 'loaded_parent_id', None)} - {None}
+    instance.loaded_parent_id = instance.question_id
+    bump_content_version(Quiz.objects.filter(questions__id__in=question_ids))
+
+
+@receiver(post_save, sender=UserSubmission)
+def submission_saved(sender, instance, created, **kwargs):
+    if created:
+        add_submissions(instance.quiz_id, 1, instance.score)
+        return
+    # New submissions reach leaderboards through their id watermark; edits
+    # cannot, so the quiz's board is rebuilt on next use. The old score is
+    # unknown here, so the quiz's totals are recomputed too.
+    discard_leaderboard(instance.quiz_id)
+    discard_analytics(instance.quiz_id)
+    repair_counters(Quiz.objects.filter(pk=instance.quiz_id))
+
+
+@receiver(post_delete, sender=UserSubmission)
+def submission_deleted(sender, instance, **kwargs):
+    discard_leaderboard(instance.quiz_id)
+    discard_analytics(instance.quiz_id)
+    Quiz.objects.filter(pk=instance.quiz_id).update(
+        submission_count=Greatest(F('submission_count') - 1, 0),
+        score_sum=F('score_sum') - instance.score,
+    )
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Deactivation and password changes must stop cached API authentication.
+    forget_user(instance)
+
+
+@receiver(connection_created)
+def use_wal_journal(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'QUIZ_SQLITE_WAL', False):
+        return
+    excluded = {Path(name) for name in getattr(settings, 'QUIZ_SQLITE_WAL_EXCLUDE', ())}
+    if Path(connection.settings_dict['NAME']) not in excluded:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
@@ -0,0 +1,131 @@
+"""
+Write-behind submission queue.
+
+In queued mode (``QUIZ_SUBMISSION_MODE = 'queued'``) the submit API only
+checks the payload shape and stores a ``QueuedSubmission`` ticket. Workers
+(``manage.py process_submissions``) then grade tickets in batches, writing a
+whole batch of submissions in one transaction instead of one per request.
+"""
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .analytics import refresh_tracked
+from .counters import add_submissions
+from .grading import DuplicateSubmission, InvalidSubmission, grade_submission, save_submission
+from .leaderboard import record_submission
+from .models import QueuedSubmission, UserAnswer, UserSubmission
+
+DUPLICATE_DETAIL = 'You have already completed this quiz.'
+
+
+def enqueue_submission(quiz_id, user, answers):
+    return QueuedSubmission.objects.create(quiz_id=quiz_id, user=user, answers=answers)
+
+
+def grade_ticket(ticket):
+    """Grade a ticket like the sync API would; raises ``InvalidSubmission`` with the same messages."""
+    graded = grade_submission(ticket.quiz, ticket.answers)
+    return graded.score, graded.user_answers
+
+
+def fail(ticket, detail):
+    ticket.status = QueuedSubmission.FAILED
+    ticket.detail = detail
+    ticket.submission = None
+
+
+def drop_duplicates(graded):
+    """Fail tickets for users who already submitted, or appear twice in the batch."""
+    existing = set(
+        UserSubmission.objects.filter(
+            quiz_id__in={ticket.quiz_id for ticket, _, _ in graded},
+            user_name_id__in={ticket.user_id for ticket, _, _ in graded},
+        ).values_list('quiz_id', 'user_name_id')
+    )
+    fresh = []
+    for item in graded:
+        ticket = item[0]
+        pair = (ticket.quiz_id, ticket.user_id)
+        if pair in existing:
+            fail(ticket, DUPLICATE_DETAIL)
+        else:
+            existing.add(pair)
+            fresh.append(item)
+    return fresh
+
+
+def write_submissions(graded):
+    """
+    Insert the submissions and answers of a batch with two bulk INSERTs. If a
+    submission made outside the queue wins a race for one of the users, the
+    batch falls back to ``save_submission`` (one savepoint per ticket).
+    """
+    try:
+        with transaction.atomic():
+            submissions = UserSubmission.objects.bulk_create(
+                UserSubmission(quiz=ticket.quiz, user_name=ticket.user, score=score, max_score=len(user_answers))
+                for ticket, score, user_answers in graded
+            )
+            rows = []
+            for submission, (ticket, _, user_answers) in zip(submissions, graded):
+                for user_answer in user_answers:
+                    user_answer.submission = submission
+                rows.extend(user_answers)
+                ticket.status = QueuedSubmission.DONE
+                ticket.submission = submission
+            UserAnswer.objects.bulk_create(rows)
+            # bulk_create sends no post_save, so the quiz totals are added here.
+            totals = {}
+            for submission in submissions:
+                count, score = totals.get(submission.quiz_id, (0, 0))
+                totals[submission.quiz_id] = (count + 1, score + submission.score)
+            for quiz_id, (count, score) in totals.items():
+                add_submissions(quiz_id, count, score)
+    except IntegrityError:
+        for ticket, score, user_answers in graded:
+            try:
+                ticket.submission = save_submission(ticket.quiz, ticket.user, score, user_answers)
+                ticket.status = QueuedSubmission.DONE
+            except DuplicateSubmission:
+                fail(ticket, DUPLICATE_DETAIL)
+        return
+
+    for submission in submissions:
+        transaction.on_commit(partial(record_submission, submission))
+
+
+def process_batch(batch_size=100):
+    """Grade up to ``batch_size`` pending tickets in one transaction; returns how many were processed."""
+    with transaction.atomic():
+        tickets = list(
+            QueuedSubmission.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status=QueuedSubmission.PENDING)
+            .select_related('quiz', 'user')
+            .order_by('id')[:batch_size]
+        )
+        if not tickets:
+            return 0
+
+        graded = []
+        for ticket in tickets:
+            try:
+                score, user_answers = grade_ticket(ticket)
+            except InvalidSubmission as exc:
+                fail(ticket, exc.detail)
+            else:
+                graded.append((ticket, score, user_answers))
+
+        if graded:
+            graded = drop_duplicates(graded)
+        if graded:
+            write_submissions(graded)
+            # Fold the batch into item analytics now rather than on the next read.
+            transaction.on_commit(partial(refresh_tracked, {ticket.quiz_id for ticket, _, _ in graded}))
+
+        now = timezone.now()
+        for ticket in tickets:
+            ticket.processed_at = now
+        QueuedSubmission.objects.bulk_update(tickets, ['status', 'detail', 'submission', 'processed_at'])
+    return len(tickets)
@@ -1,3 +1,1511 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication, grading, leaderboard
+from .analytics import refresh_analytics
+from .deletion import delete_chunk, delete_quiz, hide_quizzes
+from .benchmarks import run_benchmarks
+from .grading import get_answer_key, save_submission
+from .matching import TextMatcher, normalize
+from .middleware import RequestMetricsMiddleware
+from .views import QuizForm
+from .models import Quiz, Question, Answer, UserSubmission, UserAnswer, Event, QueuedSubmission, QuestionStats
+from .serializers import QuizSerializer, QuizSubmissionSerializer, UserSubmissionSerializer, answer_key_quiz_data
+from .submission_queue import process_batch
+
+
+def make_quiz(num_questions=3, title="Sample Quiz"):
+    quiz = Quiz.objects.create(title=title)
+    for i in range(num_questions):
+        question = Question.objects.create(quiz=quiz, text=f"Question number {i}?")
+        Answer.objects.create(question=question, text="right", is_correct=True)
+        Answer.objects.create(question=question, text="wrong")
+    quiz.refresh_from_db()
+    return quiz
+
+
+def correct_answers(quiz):
+    return {
+        str(answer.question_id): str(answer.id)
+        for answer in Answer.objects.filter(question__quiz=quiz, is_correct=True)
+    }
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username="alice", email="alice@example.com", password="Secret123")
+        self.url = reverse("api:api-register-list")
+
+    def register(self, username, email):
+        return APIClient().post(self.url, {
+            "username": username, "email": email, "password": "Secret123x", "password_2": "Secret123x",
+        }, format="json")
+
+    def user_lookups(self, queries):
+        return [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT") and "auth_user" in q["sql"]]
+
+    def test_new_account_runs_no_lookups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register("bob", "Bob@Example.com")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.user_lookups(queries), [])
+        self.assertEqual(User.objects.get(username="bob").email, "bob@example.com")
+
+    def test_duplicates_in_any_case_are_rejected_with_one_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register("ALICE", "new@example.com")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["username"], ["A user with this username already exists."])
+        self.assertEqual(len(self.user_lookups(queries)), 1)
+
+        response = self.register("alice2", "ALICE@example.com")
+        self.assertEqual(response.data["email"], ["A user with this email already exists."])
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_updates_report_duplicates_in_any_case(self):
+        bob = User.objects.create_user(username="bob", email="bob@example.com")
+        url = reverse("api:api-register-detail", args=[bob.id])
+        data = {"username": "ALICE", "email": "bob@example.com", "password": "Secret123x", "password_2": "Secret123x"}
+
+        response = APIClient().put(url, data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["username"], ["A user with this username already exists."])
+
+        response = APIClient().put(url, {**data, "username": "bob", "email": "Alice@Example.com"}, format="json")
+        self.assertEqual(response.data["email"], ["A user with this email already exists."])
+
+        response = APIClient().put(url, {**data, "username": "Bob"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_web_form_reports_duplicates(self):
+        response = self.client.post(reverse("register"), {
+            "username": "Alice", "email": "other@example.com",
+            "password": "Secret123x", "confirm_password": "Secret123x",
+        })
+
+        self.assertContains(response, "A user with this username already exists.")
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_constraints_allow_many_blank_emails(self):
+        User.objects.create(username="first")
+        User.objects.create(username="second")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(username="Alice")
+
+
+class CaseInsensitiveUserMigrationTests(TransactionTestCase):
+    before = [("quiz", "0009_text_answers")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+
+    def test_conflicting_accounts_are_listed_before_the_constraints_are_added(self):
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes("quiz")
+        self.addCleanup(self.migrate, latest)
+        self.migrate(self.before)
+        alice = User.objects.create(username="alice", email="alice@example.com")
+        other = User.objects.create(username="Alice", email="other@example.com")
+        bob = User.objects.create(username="bob", email="ALICE@example.com")
+
+        with self.assertRaisesMessage(IntegrityError, f"'alice' (id {alice.id}), 'Alice' (id {other.id})") as raised:
+            self.migrate(latest)
+        self.assertIn(f"'alice@example.com' (id {alice.id}), 'ALICE@example.com' (id {bob.id})", str(raised.exception))
+
+        User.objects.filter(username="Alice").update(username="alice2")
+        User.objects.filter(username="bob").update(email="bob@example.com")
+        self.migrate(latest)
+
+
+class UniqueSubmissionMigrationTests(TransactionTestCase):
+    before = [("quiz", "0003_quiz_content_version")]
+    migrate = CaseInsensitiveUserMigrationTests.migrate
+
+    def test_duplicate_submissions_are_listed_instead_of_deleted(self):
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes("quiz")
+        self.addCleanup(self.migrate, latest)
+        self.migrate(self.before)
+        apps = MigrationExecutor(connection).loader.project_state(self.before).apps
+        Quiz, UserSubmission = apps.get_model("quiz", "Quiz"), apps.get_model("quiz", "UserSubmission")
+        quiz = Quiz.objects.create(title="Quiz")
+        user = apps.get_model("auth", "User").objects.create(username="student")
+        first, second = (UserSubmission.objects.create(quiz=quiz, user_name_id=user.id) for _ in range(2))
+
+        with self.assertRaisesMessage(IntegrityError, f"quiz {quiz.id}, user {user.id}: submissions {first.id}, {second.id}"):
+            self.migrate(latest)
+        self.assertEqual(UserSubmission.objects.count(), 2)
+
+        UserSubmission.objects.filter(id=second.id).delete()
+        self.migrate(latest)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication._users.clear()
+        # simplejwt's modules keep the settings object they imported, which
+        # override_settings replaces rather than updates.
+        revoke = mock.patch.object(authentication.jwt_settings, "CHECK_REVOKE_TOKEN", True)
+        revoke.start()
+        self.addCleanup(revoke.stop)
+        self.user = User.objects.create_user(username="student", password="Secret123")
+        self.header = f"Bearer {AccessToken.for_user(self.user)}"
+
+    def authenticate(self, header=None):
+        request = Request(RequestFactory().get("/api/quizzes/", HTTP_AUTHORIZATION=header or self.header))
+        return authentication.CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_repeat_requests_run_no_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIsNot(user, self.authenticate())
+
+    def test_requests_never_share_a_user_instance(self):
+        first = self.authenticate()
+        first.username = "mutated"
+        first._state.fields_cache["marker"] = object()
+        second = self.authenticate()
+        self.assertEqual(second.username, "student")
+        self.assertNotIn("marker", second._state.fields_cache)
+        self.assertIsNot(first._state, second._state)
+
+    def test_deactivation_and_password_change_take_effect(self):
+        self.authenticate()
+        self.user.set_password("Changed123")
+        self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "password has been changed"):
+            self.authenticate()
+
+        header = f"Bearer {AccessToken.for_user(self.user)}"
+        self.authenticate(header)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "inactive"):
+            self.authenticate(header)
+
+    def test_tokens_without_the_password_claim_work_while_revocation_is_off(self):
+        authentication.jwt_settings.CHECK_REVOKE_TOKEN = False
+        token = AccessToken.for_user(self.user)
+        self.assertNotIn("hash_password", token.payload)
+        self.assertEqual(self.authenticate(f"Bearer {token}"), self.user)
+        self.assertEqual(self.authenticate(f"Bearer {token}"), self.user)
+
+    @override_settings(QUIZ_AUTH_CACHE_TTL=0)
+    def test_cache_can_be_disabled(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+
+class AnswerKeyTests(TestCase):
+    def test_key_is_cached_until_content_changes(self):
+        quiz = make_quiz()
+        key = get_answer_key(quiz)
+        self.assertEqual(len(key.questions), 3)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_answer_key(quiz), key)
+
+        question = Question.objects.create(quiz=quiz, text="A brand new question?")
+        quiz.refresh_from_db()
+        fresh = get_answer_key(quiz)
+        self.assertIsNot(fresh, key)
+        self.assertIn(question.id, [q.id for q in fresh.questions])
+
+    def test_answer_edit_invalidates_key(self):
+        quiz = make_quiz(1)
+        wrong = Answer.objects.get(question__quiz=quiz, is_correct=False)
+        quiz.refresh_from_db()
+        self.assertFalse(get_answer_key(quiz).is_correct(wrong.id))
+
+        wrong.is_correct = True
+        wrong.save()
+        quiz.refresh_from_db()
+        self.assertTrue(get_answer_key(quiz).is_correct(wrong.id))
+
+    def test_moving_rows_invalidates_both_quizzes(self):
+        source, target = make_quiz(2), make_quiz(1, title="Target Quiz")
+        get_answer_key(source), get_answer_key(target)
+
+        question = Question.objects.filter(quiz=source).last()
+        question.quiz = target
+        question.save()
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual(len(get_answer_key(source).questions), 1)
+        self.assertIn(question.id, [q.id for q in get_answer_key(target).questions])
+        graded = grading.grade_submission(source, correct_answers(source))
+        self.assertEqual(graded.score, 1)
+
+        answer = Answer.objects.filter(question=question).first()
+        answer.question = Question.objects.get(quiz=source)
+        answer.save()
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertIn(answer.id, dict(get_answer_key(source).choices[answer.question_id]))
+        self.assertNotIn(answer.id, dict(get_answer_key(target).choices[question.id]))
+
+
+class QuizSubmissionApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="Secret123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("api:api-quiz-submit")
+
+    def submit(self, quiz, answers):
+        return self.client.post(self.url, {"quiz_id": quiz.id, "answers": answers}, format="json")
+
+    def test_grades_submission(self):
+        quiz = make_quiz()
+        answers = correct_answers(quiz)
+        first = next(iter(answers))
+        answers[first] = str(Answer.objects.get(question_id=int(first), is_correct=False).id)
+
+        response = self.submit(quiz, answers)
+
+        self.assertEqual(response.status_code, 201)
+        submission = UserSubmission.objects.get(quiz=quiz, user_name=self.user)
+        self.assertEqual(submission.score, 2)
+        self.assertEqual(UserAnswer.objects.filter(submission=submission).count(), 3)
+
+    def test_rejects_answer_from_other_question(self):
+        quiz = make_quiz(2)
+        other = make_quiz(1, title="Other Quiz")
+        answers = correct_answers(quiz)
+        answers[next(iter(answers))] = next(iter(correct_answers(other).values()))
+
+        response = self.submit(quiz, answers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("does not belong", str(response.data))
+        self.assertFalse(UserSubmission.objects.exists())
+
+    def test_validation_queries_do_not_grow_with_quiz_size(self):
+        small, large = make_quiz(2, title="Small"), make_quiz(20, title="Large")
+        payloads = [(quiz, correct_answers(quiz)) for quiz in (small, large)]
+        get_answer_key(small)
+        get_answer_key(large)
+
+        for quiz, answers in payloads:
+            serializer = QuizSubmissionSerializer(data={"quiz_id": quiz.id, "answers": answers})
+            with self.assertNumQueries(1):
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_submission_is_written_with_two_inserts(self):
+        quiz = make_quiz(10)
+        get_answer_key(quiz)
+        answers = correct_answers(quiz)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.submit(quiz, answers).status_code, 201)
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"submission_count"', updates[0])
+        self.assertEqual(UserSubmission.objects.get().score, 10)
+
+    def test_each_row_is_read_once_and_payload_is_unchanged(self):
+        quiz = make_quiz(3)
+        answers = correct_answers(quiz)
+        grading._answer_keys.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.submit(quiz, answers)
+
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        for table in ("quiz_quiz", "quiz_question", "quiz_answer"):
+            self.assertEqual(len([sql for sql in selects if f'FROM "{table}"' in sql]), 1, table)
+        expected = UserSubmissionSerializer(UserSubmission.objects.get(), expand={"quiz", "user_answers"}).data
+        self.assertEqual(json.loads(JSONRenderer().render(response.data["submission"])),
+                         json.loads(JSONRenderer().render(expected)))
+
+    def test_answer_key_quiz_data_matches_quiz_serializer(self):
+        quiz = make_quiz(2)
+        quiz.description = None
+        quiz.save()
+        text = Question.objects.create(quiz=quiz, text="Who created Python?", question_type="TEXT")
+        Question.objects.create(quiz=quiz, text="Anything to add?", question_type="TEXT")
+        # Interleave answer ids across questions.
+        Answer.objects.create(question=text, text="Guido van Rossum", is_correct=True)
+        Answer.objects.create(question=quiz.questions.first(), text="Late option")
+        Answer.objects.create(question=text, text="Linus Torvalds")
+        quiz.refresh_from_db()
+        grading._answer_keys.clear()
+
+        expected = QuizSerializer(Quiz.objects.prefetch_related("questions__answers").get(pk=quiz.pk)).data
+        self.assertEqual(answer_key_quiz_data(quiz, get_answer_key(quiz)), expected)
+
+    def test_error_messages(self):
+        quiz = make_quiz(2)
+        answers = correct_answers(quiz)
+        answers.popitem()
+        self.assertEqual(self.submit(quiz, answers).data,
+                         {"non_field_errors": ["Please answer question: Question number 1?..."]})
+        self.assertEqual(self.submit(Quiz(id=999), answers).data, {"quiz_id": ["Quiz does not exist."]})
+
+        answers = correct_answers(quiz)
+        answers[next(iter(answers))] = "99999"
+        self.assertEqual(self.submit(quiz, answers).data,
+                         {"non_field_errors": ["Selected answer does not exist for question: Question number 0?..."]})
+
+    def test_second_submission_is_rejected(self):
+        quiz = make_quiz()
+        answers = correct_answers(quiz)
+        self.assertEqual(self.submit(quiz, answers).status_code, 201)
+
+        response = self.submit(quiz, answers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["detail"], "You have already completed this quiz.")
+        self.assertEqual(UserSubmission.objects.count(), 1)
+
+
+class TextAnswerTests(TestCase):
+    def setUp(self):
+        # Quiz ids are reused between tests, so keys cached by earlier tests could match.
+        grading._answer_keys.clear()
+        self.quiz = make_quiz(1)
+        self.question = Question.objects.create(quiz=self.quiz, text="Who created Python?", question_type="TEXT")
+        self.accepted = Answer.objects.create(question=self.question, text="Guido van Rossum", is_correct=True)
+        self.known_wrong = Answer.objects.create(question=self.question, text="Linus Torvalds")
+        self.quiz.refresh_from_db()
+        self.user = User.objects.create_user(username="student")
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Guido\tVAN-Rossum!! "), "guido van-rossum!!")
+        self.assertEqual(normalize("ＧＵＩＤＯ"), "guido")
+        self.assertEqual(normalize("Straße"), "strasse")
+
+    def test_punctuation_only_counts_when_it_tells_answers_apart(self):
+        matcher = TextMatcher([(1, "C++", True), (2, "C", False), (3, "C#", False), (4, "Guido van Rossum", True)])
+        self.assertEqual(matcher.match("c++"), 1)
+        self.assertEqual(matcher.match("C"), 2)
+        self.assertEqual(matcher.match(" c# "), 3)
+        self.assertIsNone(matcher.match("C!"))
+        self.assertEqual(matcher.match("guido van-rossum."), 4)
+
+    def test_answers_made_of_punctuation_match_only_themselves(self):
+        matcher = TextMatcher([(1, "!!!", True), (2, "?", False)])
+        self.assertEqual(matcher.match("!!!"), 1)
+        self.assertIsNone(matcher.match("???"))
+        self.assertIsNone(matcher.match("   "))
+
+    def test_a_text_that_is_also_a_wrong_answer_is_not_correct(self):
+        matcher = TextMatcher([(1, "Paris", True), (2, "paris", False)])
+        self.assertEqual(matcher.match("PARIS"), 2)
+
+    def test_api_does_not_credit_other_punctuation(self):
+        Answer.objects.filter(question=self.question).delete()
+        Answer.objects.create(question=self.question, text="!!!", is_correct=True)
+        self.quiz.refresh_from_db()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        answers = correct_answers(self.quiz)
+        answers[str(self.question.id)] = "???"
+
+        client.post(reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": answers}, format="json")
+
+        self.assertEqual(UserSubmission.objects.get().score, 1)
+        self.assertFalse(UserAnswer.objects.get(question=self.question).is_correct)
+
+    def test_matcher_tolerance_is_bounded(self):
+        exact = TextMatcher([(1, "Guido van Rossum", True), (2, "cat", True)])
+        self.assertIsNone(exact.match("Guido van Rosum"))
+
+        tolerant = TextMatcher([(1, "Guido van Rossum", True), (2, "cat", True)], distance=2)
+        self.assertEqual(tolerant.match("Gudio van Rossum"), 1)
+        self.assertIsNone(tolerant.match("Guido"))
+        self.assertIsNone(tolerant.match("car"))
+
+    def test_api_grades_text_answers(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        answers = correct_answers(self.quiz)
+        answers[str(self.question.id)] = " guido VAN-rossum. "
+
+        response = client.post(reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": answers}, format="json")
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(UserSubmission.objects.get().score, 2)
+        user_answer = UserAnswer.objects.get(question=self.question)
+        self.assertEqual((user_answer.answer, user_answer.text, user_answer.is_correct), (self.accepted, "guido VAN-rossum.", True))
+
+    def test_web_form_grades_text_answers(self):
+        self.client.force_login(self.user)
+        data = {f"question_{q}": a for q, a in correct_answers(self.quiz).items()}
+        data[f"question_{self.question.id}"] = "linus torvalds"
+
+        self.client.post(reverse("quiz_detail", args=[self.quiz.id]), data)
+
+        self.assertEqual(UserSubmission.objects.get().score, 1)
+        user_answer = UserAnswer.objects.get(question=self.question)
+        self.assertEqual((user_answer.answer, user_answer.is_correct), (self.known_wrong, False))
+
+        UserSubmission.objects.all().delete()
+        data[f"question_{self.question.id}"] = "Monty"
+        self.client.post(reverse("quiz_detail", args=[self.quiz.id]), data)
+        self.assertIsNone(UserAnswer.objects.get(question=self.question).answer)
+
+
+class QuizCounterTests(TestCase):
+    def setUp(self):
+        self.quiz = make_quiz()
+        self.user = User.objects.create(username="student")
+
+    def counters(self):
+        self.quiz.refresh_from_db()
+        return self.quiz.question_count, self.quiz.submission_count, self.quiz.score_sum
+
+    def test_counters_follow_writes(self):
+        self.assertEqual(self.counters(), (3, 0, 0))
+
+        submission = save_submission(self.quiz, self.user, 2, [
+            UserAnswer(question_id=question_id, answer_id=int(answer_id), is_correct=True)
+            for question_id, answer_id in correct_answers(self.quiz).items()
+        ])
+        self.assertEqual(submission.max_score, 3)
+        self.assertEqual(self.counters(), (3, 1, 2))
+        self.assertEqual(self.quiz.average_score, 2)
+
+        submission.score = 3
+        submission.save()
+        self.assertEqual(self.counters(), (3, 1, 3))
+
+        submission.delete()
+        self.quiz.questions.first().delete()
+        self.assertEqual(self.counters(), (2, 0, 0))
+
+    def test_moving_a_question_moves_its_count(self):
+        target = make_quiz(1, title="Target Quiz")
+        question = self.quiz.questions.last()
+        question.quiz = target
+        question.save()
+
+        self.assertEqual(self.counters(), (2, 0, 0))
+        target.refresh_from_db()
+        self.assertEqual(target.question_count, 2)
+
+    def test_repair_command_recomputes_counters(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(question_count=0, submission_count=7, score_sum=9)
+        out = io.StringIO()
+        call_command("repair_quiz_counters", stdout=out)
+        self.assertEqual(self.counters(), (3, 0, 0))
+        self.assertIn("1 quiz(zes) repaired", out.getvalue())
+
+
+class ConcurrentSubmissionTests(TransactionTestCase):
+    def test_parallel_submits_leave_one_submission(self):
+        user = User.objects.create_user(username="student", password="Secret123")
+        quiz = make_quiz()
+        payload = {"quiz_id": quiz.id, "answers": correct_answers(quiz)}
+        url = reverse("api:api-quiz-submit")
+        workers = 8
+        barrier = threading.Barrier(workers)
+        statuses = []
+
+        def submit():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                statuses.append(client.post(url, payload, format="json").status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(UserSubmission.objects.filter(quiz=quiz, user_name=user).count(), 1)
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(400), workers - 1)
+        self.assertEqual(UserAnswer.objects.count(), 3)
+
+
+@override_settings(QUIZ_SUBMISSION_MODE="queued")
+class QueuedSubmissionTests(TestCase):
+    def setUp(self):
+        self.quiz = make_quiz()
+        self.users = [User.objects.create(username=f"student{i}") for i in range(3)]
+
+    def submit(self, user, answers):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, client.post(
+            reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": answers}, format="json",
+        )
+
+    def test_submit_is_accepted_then_graded_in_one_batch(self):
+        tickets = []
+        for user in self.users:
+            client, response = self.submit(user, correct_answers(self.quiz))
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response["Location"], reverse("api:api-quiz-submission-status", args=[response.data["ticket"]]))
+            tickets.append((client, response["Location"]))
+        self.assertFalse(UserSubmission.objects.exists())
+        self.assertEqual(tickets[0][0].get(tickets[0][1]).data["status"], "pending")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(process_batch(), 3)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+
+        for client, url in tickets:
+            data = client.get(url).data
+            self.assertEqual(data["status"], "done")
+            self.assertEqual(data["submission"]["score"], 3)
+        self.assertEqual(UserAnswer.objects.count(), 9)
+        self.assertEqual(process_batch(), 0)
+
+    def test_invalid_and_duplicate_tickets_fail_with_api_messages(self):
+        answers = correct_answers(self.quiz)
+        wrong = dict(answers, **{next(iter(answers)): "99999"})
+        client, bad = self.submit(self.users[0], wrong)
+        _, first = self.submit(self.users[1], answers)
+        _, again = self.submit(self.users[1], answers)
+
+        process_batch()
+
+        bad_status = client.get(bad["Location"]).data
+        self.assertEqual(bad_status["status"], "failed")
+        self.assertIn("does not exist", bad_status["detail"])
+        statuses = QueuedSubmission.objects.in_bulk([first.data["ticket"], again.data["ticket"]])
+        self.assertEqual(statuses[first.data["ticket"]].status, "done")
+        self.assertEqual(statuses[again.data["ticket"]].detail, "You have already completed this quiz.")
+        self.assertEqual(UserSubmission.objects.count(), 1)
+
+    def test_payload_shape_is_checked_and_tickets_are_private(self):
+        _, response = self.submit(self.users[0], {})
+        self.assertEqual(response.status_code, 400)
+
+        _, response = self.submit(self.users[0], correct_answers(self.quiz))
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        self.assertEqual(other.get(response["Location"]).status_code, 404)
+
+
+class QuizBulkCreateApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="author"))
+        self.url = reverse("api:api-quiz-bulk-create")
+
+    def document(self, num_questions):
+        return {
+            "title": "Bulk Quiz",
+            "questions": [
+                {
+                    "text": f"Bulk question {i}?",
+                    "answers": [{"text": "right", "is_correct": True}, {"text": "wrong"}],
+                }
+                for i in range(num_questions)
+            ] + [{"text": "Explain your answer.", "question_type": "TEXT"}],
+        }
+
+    def test_creates_whole_quiz_with_constant_queries(self):
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, self.document(50), format="json")
+
+        self.assertEqual(response.status_code, 201)
+        quiz = Quiz.objects.get(pk=response.data["quiz"]["id"])
+        self.assertEqual(quiz.question_count, 51)
+        self.assertEqual(len(response.data["quiz"]["questions"]), 51)
+        self.assertEqual(Answer.objects.filter(question__quiz=quiz, is_correct=True).count(), 50)
+        self.assertEqual(len(get_answer_key(quiz).questions), 51)
+
+    def test_reports_errors_with_paths_and_writes_nothing(self):
+        document = self.document(2)
+        document["questions"][1]["text"] = "BULK QUESTION 0?"
+        document["questions"][0]["answers"][1]["is_correct"] = True
+
+        response = self.client.post(self.url, document, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        paths = {error["path"] for error in response.data["errors"]}
+        self.assertEqual(paths, {"questions[1].text", "questions[0].answers[1].is_correct"})
+        self.assertFalse(Quiz.objects.exists())
+
+
+class AsyncApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="Secret123")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.url = reverse("api:api-async-quiz-submit")
+
+    def submit(self, quiz, answers):
+        body = json.dumps({"quiz_id": quiz.id, "answers": answers})
+        return self.client.post(self.url, body, content_type="application/json", **self.auth)
+
+    def test_submit_grades_and_rejects_duplicates(self):
+        quiz = make_quiz()
+        response = self.submit(quiz, correct_answers(quiz))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["submission"]["score"], 3)
+        self.assertEqual(UserAnswer.objects.filter(submission__user_name=self.user).count(), 3)
+
+        response = self.submit(quiz, correct_answers(quiz))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "You have already completed this quiz.")
+
+    def test_submit_responses_match_sync_api(self):
+        quiz = make_quiz(2)
+        other = make_quiz(1, title="Other Quiz")
+        api = APIClient()
+        api.force_authenticate(self.user)
+        first = next(iter(correct_answers(quiz)))
+        payloads = [
+            {"quiz_id": quiz.id, "answers": {**correct_answers(quiz), first: next(iter(correct_answers(other).values()))}},
+            {"quiz_id": quiz.id, "answers": {**correct_answers(quiz), first: "99999"}},
+            {"quiz_id": quiz.id, "answers": {**correct_answers(quiz), first: None}},
+            {"quiz_id": quiz.id, "answers": {}},
+            {"quiz_id": 99999, "answers": correct_answers(quiz)},
+            {"quiz_id": quiz.id, "answers": correct_answers(quiz)},
+            {"quiz_id": quiz.id, "answers": correct_answers(quiz)},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                response = self.client.post(self.url, json.dumps(payload), content_type="application/json", **self.auth)
+                if response.status_code == 201:
+                    UserSubmission.objects.all().delete()
+                expected = api.post(reverse("api:api-quiz-submit"), payload, format="json")
+                self.assertEqual(response.status_code, expected.status_code)
+                body, expected_body = response.json(), expected.json()
+                if response.status_code == 201:
+                    for submission in (body, expected_body):
+                        submission["submission"].pop("id")
+                        submission["submission"].pop("submitted_at")
+                        for answer in submission["submission"]["user_answers"]:
+                            answer.pop("id"), answer.pop("submission")
+                self.assertEqual(body, expected_body)
+
+    def test_requires_jwt(self):
+        quiz = make_quiz(1)
+        response = self.client.post(
+            self.url, json.dumps({"quiz_id": quiz.id, "answers": correct_answers(quiz)}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse("api:api-async-quiz-list"), HTTP_AUTHORIZATION="Bearer nonsense")
+        self.assertEqual(response.status_code, 401)
+
+    def test_fetch_matches_sync_api(self):
+        quiz = make_quiz()
+        api = APIClient()
+        api.force_authenticate(self.user)
+        for sync_name, async_name, args in [
+            ("api:api-quiz-list", "api:api-async-quiz-list", []),
+            ("api:api-quiz-detail", "api:api-async-quiz-detail", [quiz.id]),
+        ]:
+            expected = api.get(reverse(sync_name, args=args))
+            response = self.client.get(reverse(async_name, args=args), **self.auth)
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(response["ETag"], expected["ETag"])
+
+        response = self.client.get(reverse("api:api-async-quiz-detail", args=[quiz.id]),
+                                   HTTP_IF_NONE_MATCH=expected["ETag"], **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_asgi_stack_records_queries(self):
+        quiz = await Quiz.objects.acreate(title="Async Quiz")
+        token = str(AccessToken.for_user(self.user))
+        response = await AsyncClient().get(
+            reverse("api:api-async-quiz-detail", args=[quiz.id]), headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries"')
+
+
+class QuizDetailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="Secret123")
+        self.client.force_login(self.user)
+        self.quiz = make_quiz()
+        self.url = reverse("quiz_detail", args=[self.quiz.id])
+
+    def form_data(self):
+        return {f"question_{q}": a for q, a in correct_answers(self.quiz).items()}
+
+    def test_submits_and_redirects_to_result(self):
+        response = self.client.post(self.url, self.form_data())
+
+        submission = UserSubmission.objects.get(quiz=self.quiz, user_name=self.user)
+        self.assertRedirects(response, reverse("quiz_result", args=[submission.id]))
+        self.assertEqual(submission.score, 3)
+        self.assertEqual(submission.user_answers.count(), 3)
+
+    def test_invalid_form_writes_nothing(self):
+        data = self.form_data()
+        data.popitem()
+
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(UserSubmission.objects.exists())
+        self.assertFalse(UserAnswer.objects.exists())
+
+    def test_second_post_is_rejected_by_the_constraint(self):
+        self.client.post(self.url, self.form_data())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.form_data(), follow=True)
+
+        self.assertRedirects(response, reverse("quiz_list"))
+        self.assertContains(response, "You have already completed this quiz.")
+        self.assertEqual(UserSubmission.objects.count(), 1)
+        self.assertEqual(UserAnswer.objects.count(), 3)
+        # No existence check before the INSERT: the constraint is the check.
+        self.assertFalse([q for q in queries.captured_queries if q["sql"].startswith('SELECT 1 AS "a" FROM "quiz_usersubmission"')])
+
+    def test_records_the_same_answers_as_the_api(self):
+        answers = correct_answers(self.quiz)
+        wrong = Answer.objects.filter(question__quiz=self.quiz, is_correct=False).first()
+        answers[str(wrong.question_id)] = str(wrong.id)
+        self.client.post(self.url, {f"question_{q}": a for q, a in answers.items()})
+
+        api = APIClient()
+        api.force_authenticate(User.objects.create_user(username="api-student"))
+        api.post(reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": answers}, format="json")
+
+        web, rest = UserSubmission.objects.order_by("id")
+        fields = ("question_id", "answer_id", "text", "is_correct")
+        self.assertEqual(web.score, rest.score)
+        self.assertEqual(
+            list(web.user_answers.order_by("question_id").values_list(*fields)),
+            list(rest.user_answers.order_by("question_id").values_list(*fields)),
+        )
+
+    def test_form_is_built_from_cached_key(self):
+        answer_key = get_answer_key(self.quiz)
+        with self.assertNumQueries(0):
+            form = QuizForm(answer_key=answer_key)
+            rendered = form.as_p()
+        self.assertEqual(len(form.fields), 3)
+        for answer in Answer.objects.filter(question__quiz=self.quiz):
+            self.assertIn(answer.text, rendered)
+
+        answer = Answer.objects.filter(question__quiz=self.quiz).first()
+        answer.text = "renamed option"
+        answer.save()
+        self.quiz.refresh_from_db()
+        self.assertIn("renamed option", QuizForm(answer_key=get_answer_key(self.quiz)).as_p())
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create(username="student"))
+        self.quiz = make_quiz()
+
+    def test_question_cards_follow_content_version(self):
+        url = reverse("quiz_detail", args=[self.quiz.id])
+        self.assertContains(self.client.get(url), "Question number 0?")
+
+        question = self.quiz.questions.order_by("id").first()
+        question.text = "A reworded question?"
+        question.save()
+
+        response = self.client.get(url)
+        self.assertContains(response, "A reworded question?")
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_quiz_grid_and_event_cards_follow_row_changes(self):
+        self.assertContains(self.client.get(reverse("quiz_list")), "Sample Quiz")
+        make_quiz(1, title="Fresh Quiz")
+        self.assertContains(self.client.get(reverse("quiz_list")), "Fresh Quiz")
+
+        event = Event.objects.create(title="Launch", date=datetime.date.today(), location="Hall")
+        self.assertContains(self.client.get(reverse("events")), "Launch")
+        event.title = "Launch party"
+        event.save()
+        self.assertContains(self.client.get(reverse("events")), "Launch party")
+
+
+class QuizViewSetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="student", password="Secret123"))
+        self.quizzes = [make_quiz(3, title=f"Quiz {i}") for i in range(4)]
+
+    def test_list_matches_serializer_and_is_cached(self):
+        url = reverse("api:api-quiz-list")
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        expected = QuizSerializer(Quiz.objects.order_by("id"), many=True).data
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(expected)))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, response.content)
+
+    def test_question_edit_refreshes_cached_quiz(self):
+        quiz = self.quizzes[0]
+        url = reverse("api:api-quiz-detail", args=[quiz.id])
+        self.client.get(url)
+
+        Question.objects.create(quiz=quiz, text="Added later?")
+
+        data = json.loads(self.client.get(url).content)
+        self.assertIn("Added later?", [q["text"] for q in data["questions"]])
+
+    def test_retrieve_missing_quiz(self):
+        self.assertEqual(self.client.get(reverse("api:api-quiz-detail", args=[999])).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="student", password="Secret123"))
+        self.quiz = make_quiz(2)
+        self.event = Event.objects.create(title="Finals", date=datetime.date(2030, 1, 1), location="Main Hall")
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(not_modified.status_code, 304)
+        return response["ETag"]
+
+    def test_quiz_list_and_detail(self):
+        list_etag = self.assert_revalidates(reverse("api:api-quiz-list"))
+        detail_url = reverse("api:api-quiz-detail", args=[self.quiz.id])
+        detail_etag = self.assert_revalidates(detail_url)
+
+        Answer.objects.filter(question__quiz=self.quiz).first().save()
+
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse("api:api-quiz-list"), HTTP_IF_NONE_MATCH=list_etag).status_code, 200
+        )
+
+    def test_event_list_and_detail(self):
+        list_etag = self.assert_revalidates(reverse("api:api-event-list"))
+        self.assert_revalidates(reverse("api:api-event-detail", args=[self.event.id]))
+
+        Event.objects.create(title="Semis", date=datetime.date(2029, 6, 1), location="Hall B")
+
+        response = self.client.get(reverse("api:api-event-list"), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class EventCalendarTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="student", password="Secret123"))
+        self.url = reverse("api:api-event-list")
+        # Several events share a date, so pages must break ties on id.
+        self.events = [
+            Event.objects.create(title=f"Event {i}", date=datetime.date(2030, 1, 1 + i // 3), location="Hall")
+            for i in range(10)
+        ]
+
+    def collect(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles += [event["title"] for event in response.data["results"]]
+            url = response.data["next"]
+        return titles
+
+    def test_keyset_pages_cover_every_event_once_in_date_order(self):
+        self.assertEqual(self.collect(self.url + "?page_size=4"), [event.title for event in self.events])
+
+    def test_page_is_a_single_range_query(self):
+        first = self.client.get(self.url + "?page_size=4")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+        selects = [q["sql"] for q in queries.captured_queries if 'FROM "quiz_event"' in q["sql"]]
+        # The ETag aggregate and the page itself; no COUNT or OFFSET.
+        self.assertEqual(len(selects), 2)
+        self.assertNotIn("OFFSET", selects[1])
+
+    def test_from_and_to_are_inclusive(self):
+        titles = self.collect(self.url + "?from=2030-01-02&to=2030-01-03&page_size=2")
+        self.assertEqual(titles, [event.title for event in self.events[3:9]])
+
+    def test_invalid_bounds_and_cursors_are_rejected(self):
+        response = self.client.get(self.url + "?from=tomorrow&to=2030-01-03")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ["from"])
+        self.assertEqual(self.client.get(self.url + "?cursor=bogus").status_code, 404)
+
+    def test_ical_feed_is_streamed(self):
+        Event.objects.create(
+            title="Finals, round 2; live", description="x" * 100, date=datetime.date(2031, 5, 4), location="Hall"
+        )
+        response = self.client.get(reverse("events_ical") + "?from=2031-01-01")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response["Content-Type"].startswith("text/calendar"))
+        body = b"".join(response.streaming_content).decode()
+        lines = body.split("\r\n")
+        self.assertEqual(lines[0], "BEGIN:VCALENDAR")
+        self.assertEqual(body.count("BEGIN:VEVENT"), 1)
+        self.assertIn("SUMMARY:Finals\\, round 2\\; live", lines)
+        self.assertIn("DTSTART;VALUE=DATE:20310504", lines)
+        self.assertIn("DTEND;VALUE=DATE:20310505", lines)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertTrue(any(line.startswith(" ") for line in lines))
+        self.assertEqual(self.client.get(reverse("events_ical") + "?to=soon").status_code, 400)
+
+    def test_events_page_reads_events_once_and_not_on_a_cache_hit(self):
+        cache.clear()
+        Event.objects.update(date=timezone.now().date())
+        with CaptureQueriesContext(connection) as cold:
+            response = self.client.get(reverse("events"))
+        self.assertContains(response, "Event 9")
+        selects = [q for q in cold.captured_queries if q["sql"].startswith('SELECT "quiz_event"."id"')]
+        self.assertEqual(len(selects), 1)
+
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(reverse("events"))
+        self.assertFalse([q for q in warm.captured_queries if q["sql"].startswith('SELECT "quiz_event"."id"')])
+
+
+class UserSubmissionViewSetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="Secret123")
+        other = User.objects.create_user(username="other", password="Secret123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quizzes = [make_quiz(3, title=f"Quiz {i}") for i in range(3)]
+        for quiz in self.quizzes:
+            UserSubmission.objects.create(quiz=quiz, user_name=self.user, score=1)
+        UserSubmission.objects.create(quiz=self.quizzes[0], user_name=other, score=3)
+        self.url = reverse("api:api-submission-list")
+
+    def test_default_payload_is_slim_and_scoped_to_user(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        results = response.data["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(results[0]), {"id", "quiz", "user_name", "score", "submitted_at"})
+        self.assertEqual({r["user_name"] for r in results}, {self.user.id})
+        self.assertLess(len(response.content) / len(results), 300)
+
+    def test_sparse_fields_and_expand(self):
+        response = self.client.get(self.url, {"fields": "id,score"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "score"})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"expand": "quiz"})
+        self.assertEqual(len(response.data["results"][0]["quiz"]["questions"]), 3)
+
+    def test_cursor_pagination(self):
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+
+class SubmissionExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="Secret123", is_staff=True)
+        self.quiz = make_quiz(2)
+        self.other_quiz = make_quiz(1, title="Other")
+        self.students = [User.objects.create_user(username=f"student{i}") for i in range(3)]
+        self.client = APIClient()
+        for student in self.students:
+            self.client.force_authenticate(student)
+            self.client.post(reverse("api:api-quiz-submit"), {
+                "quiz_id": self.quiz.id, "answers": correct_answers(self.quiz),
+            }, format="json")
+        UserSubmission.objects.create(quiz=self.other_quiz, user_name=self.students[0])
+        self.client.force_authenticate(self.admin)
+
+    def url(self, fmt):
+        return reverse("api:api-submission-export", kwargs={"fmt": fmt})
+
+    def test_csv_streams_one_row_per_answer(self):
+        response = self.client.get(self.url("csv"), {"quiz": self.quiz.id})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["submission_id", "quiz_id", "user_id"])
+        self.assertEqual(len(lines), 1 + 3 * 2)
+        self.assertTrue(all(line.endswith(",right,True,") for line in lines[1:]))
+
+    def test_ndjson_nests_answers_and_keeps_empty_submissions(self):
+        response = self.client.get(self.url("ndjson"))
+
+        documents = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(documents), 4)
+        self.assertEqual([len(document["answers"]) for document in documents], [2, 2, 2, 0])
+        self.assertEqual(documents[0]["username"], "student0")
+
+    def test_date_range_and_permissions(self):
+        response = self.client.get(self.url("csv"), {"until": "2000-01-01"})
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 1)
+
+        response = self.client.get(self.url("csv"), {"quiz": "first", "since": "not-a-date", "until": "2024-02-30"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            "quiz": ["A valid integer is required."],
+            "since": ["Enter a valid date or date and time."],
+            "until": ["Enter a valid date or date and time."],
+        })
+
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url("csv")).status_code, 403)
+
+    def test_command_writes_ndjson(self):
+        out = io.StringIO()
+        call_command("export_submissions", "--format", "ndjson", "--quiz", self.other_quiz.id, "--chunk-size", "1", stdout=out)
+
+        documents = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([document["quiz_id"] for document in documents], [self.other_quiz.id])
+
+
+class ItemAnalyticsTests(TestCase):
+    def setUp(self):
+        self.quiz = make_quiz(2)
+        self.questions = list(self.quiz.questions.order_by("id"))
+        self.right = correct_answers(self.quiz)
+        self.wrong = {
+            str(answer.question_id): str(answer.id)
+            for answer in Answer.objects.filter(question__quiz=self.quiz, is_correct=False)
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        self.url = reverse("api:api-quiz-analytics", kwargs={"pk": self.quiz.id})
+        # Question 0 is answered correctly by the two best students only.
+        for i, picks in enumerate([(True, True), (True, False), (False, True), (False, False)]):
+            self.submit(f"student{i}", picks)
+
+    def submit(self, username, picks):
+        student = APIClient()
+        student.force_authenticate(User.objects.create_user(username=username))
+        answers = {}
+        for question, correct in zip(self.questions, picks):
+            key = str(question.id)
+            answers[key] = (self.right if correct else self.wrong)[key]
+        response = student.post(reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": answers}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def fetch(self):
+        return self.client.get(self.url).data["questions"]
+
+    def test_percent_correct_distractors_and_discrimination(self):
+        first, second = self.fetch()
+
+        self.assertEqual(first["attempts"], 4)
+        self.assertEqual(first["percent_correct"], 50)
+        self.assertEqual([answer["picks"] for answer in first["answers"]], [2, 2])
+        self.assertEqual(first["answers"][1]["pick_rate"], 0.5)
+        # Right/wrong on question 0 against scores on the rest (1, 0, 1, 0): uncorrelated.
+        self.assertEqual(first["discrimination"], 0)
+        self.assertEqual(second["discrimination"], 0)
+
+        self.submit("student4", (True, True))
+        self.submit("student5", (False, False))
+        first, _ = self.fetch()
+        self.assertEqual(first["attempts"], 6)
+        self.assertAlmostEqual(first["discrimination"], 1 / 3)
+
+    def test_refresh_is_incremental_and_matches_rebuild(self):
+        self.fetch()
+        with CaptureQueriesContext(connection) as queries:
+            self.submit("student4", (True, False))
+        self.assertFalse(any("stats" in q["sql"] for q in queries.captured_queries))
+        with CaptureQueriesContext(connection) as queries:
+            incremental = self.fetch()
+        aggregates = [q["sql"] for q in queries.captured_queries if "GROUP BY" in q["sql"]]
+        self.assertEqual(len(aggregates), 1)
+
+        call_command("rebuild_item_analytics", stdout=io.StringIO())
+        self.assertEqual(self.fetch(), incremental)
+
+    def test_submission_committed_after_a_higher_id_is_not_skipped(self):
+        self.fetch()
+        graded = grading.grade_submission(self.quiz, self.right)
+        base = UserSubmission.objects.order_by("-id").first().id
+
+        def insert(offset, username):
+            submission = UserSubmission.objects.create(
+                id=base + offset, quiz=self.quiz, user_name=User.objects.create_user(username=username), score=2,
+            )
+            for user_answer in graded.user_answers:
+                user_answer.pk, user_answer.submission = None, submission
+            UserAnswer.objects.bulk_create(graded.user_answers)
+
+        insert(100, "late-high")
+        self.fetch()
+        # Lands after the refresh above although its id is lower.
+        insert(50, "late-low")
+        first, _ = self.fetch()
+        self.assertEqual(first["attempts"], 6)
+
+    def test_queue_workers_fold_submissions_in_as_they_land(self):
+        self.fetch()
+        user = User.objects.create_user(username="queued")
+        QueuedSubmission.objects.create(quiz=self.quiz, user=user, answers=self.right)
+        with self.captureOnCommitCallbacks(execute=True):
+            process_batch()
+        self.assertEqual(QuestionStats.objects.get(question=self.questions[0]).attempts, 5)
+        self.assertFalse(UserSubmission.objects.filter(quiz=self.quiz, analytics_batch__isnull=True).exists())
+
+    def test_deleting_a_submission_rebuilds(self):
+        self.fetch()
+        UserSubmission.objects.filter(user_name__username="student0").delete()
+
+        first, _ = self.fetch()
+        self.assertEqual(first["attempts"], 3)
+        self.assertEqual(first["answers"][0]["picks"], 1)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user(username="student"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AdminChangelistTests(TestCase):
+    # Session, user, estimate and count (or the unfiltered total), page rows,
+    # and the date hierarchy's bounds and dates.
+    QUERY_BUDGET = 7
+    CHANGELISTS = ("quiz", "question", "answer", "usersubmission", "useranswer", "queuedsubmission", "event")
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username="admin", password="Secret123"))
+        self.quiz = make_quiz(3)
+
+    def add_submissions(self, count):
+        answers = list(Answer.objects.filter(question__quiz=self.quiz, is_correct=True))
+        for _ in range(count):
+            user = User.objects.create_user(username=f"student{User.objects.count()}")
+            submission = UserSubmission.objects.create(quiz=self.quiz, user_name=user, score=3)
+            UserAnswer.objects.bulk_create(
+                UserAnswer(submission=submission, question_id=a.question_id, answer=a, is_correct=True)
+                for a in answers
+            )
+            QueuedSubmission.objects.create(quiz=self.quiz, user=user, answers={}, submission=submission)
+            Event.objects.create(title=f"Event {submission.id}", date=datetime.date(2030, 1, 1), location="Hall")
+
+    def changelist_queries(self, name, query=""):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f"admin:quiz_{name}_changelist") + query)
+        self.assertEqual(response.status_code, 200)
+        return [q["sql"] for q in queries.captured_queries]
+
+    def test_changelists_stay_within_a_fixed_query_budget(self):
+        self.add_submissions(2)
+        small = {name: len(self.changelist_queries(name)) for name in self.CHANGELISTS}
+        self.add_submissions(10)
+        for name in self.CHANGELISTS:
+            queries = len(self.changelist_queries(name))
+            self.assertEqual(queries, small[name], name)
+            self.assertLessEqual(queries, self.QUERY_BUDGET, name)
+
+    @override_settings(QUIZ_ADMIN_ESTIMATE_THRESHOLD=1)
+    def test_large_unfiltered_changelists_estimate_their_count(self):
+        self.add_submissions(3)
+        queries = self.changelist_queries("useranswer")
+        self.assertFalse([sql for sql in queries if "COUNT(" in sql])
+
+        year = UserSubmission.objects.first().submitted_at.year
+        queries = self.changelist_queries("usersubmission", f"?submitted_at__year={year}")
+        self.assertEqual(len([sql for sql in queries if "COUNT(" in sql]), 1)
+
+    def test_estimate_falls_back_to_an_exact_count_below_the_threshold(self):
+        self.add_submissions(2)
+        response = self.client.get(reverse("admin:quiz_useranswer_changelist"))
+        self.assertEqual(response.context["cl"].result_count, 6)
+
+
+class QuizDeletionTests(TestCase):
+    def setUp(self):
+        grading._answer_keys.clear()
+        self.quiz = make_quiz(3)
+        self.other = make_quiz(2, title="Other Quiz")
+        for quiz in (self.quiz, self.other):
+            for i in range(3):
+                user = User.objects.create_user(username=f"student{quiz.id}-{i}")
+                graded = grading.grade_submission(quiz, correct_answers(quiz))
+                save_submission(quiz, user, graded.score, graded.user_answers)
+                QueuedSubmission.objects.create(quiz=quiz, user=user, answers={})
+        refresh_analytics(self.quiz.id)
+
+    def assert_only_other_quiz_remains(self):
+        self.assertEqual(list(Quiz.all_objects.values_list("id", flat=True)), [self.other.id])
+        for model in (Question, UserSubmission, QueuedSubmission):
+            self.assertFalse(model.objects.exclude(quiz=self.other).exists(), model)
+        self.assertFalse(Answer.objects.exclude(question__quiz=self.other).exists())
+        self.assertFalse(UserAnswer.objects.exclude(submission__quiz=self.other).exists())
+        self.assertEqual(UserAnswer.objects.count(), 3 * 2)
+        self.other.refresh_from_db()
+        self.assertEqual((self.other.question_count, self.other.submission_count), (2, 3))
+
+    def test_deletes_from_the_leaves_up_in_bounded_chunks(self):
+        reported = []
+        with CaptureQueriesContext(connection) as queries:
+            deleted = delete_quiz(self.quiz.id, chunk_size=4, progress=lambda model, n: reported.append((model, n)))
+
+        self.assert_only_other_quiz_remains()
+        self.assertEqual(deleted[UserAnswer], 9)
+        self.assertEqual(deleted[Answer], 6)
+        self.assertEqual(deleted[Quiz], 1)
+        self.assertEqual([n for model, n in reported if model is UserAnswer], [4, 8, 9])
+        order = list(dict.fromkeys(model for model, _ in reported))
+        self.assertLess(order.index(UserAnswer), order.index(UserSubmission))
+        self.assertLess(order.index(Answer), order.index(Question))
+        answer_deletes = [q for q in queries.captured_queries if q["sql"].startswith('DELETE FROM "quiz_useranswer"')]
+        self.assertEqual(len(answer_deletes), 3)
+
+    def test_hidden_quizzes_disappear_from_the_site_and_the_api(self):
+        hide_quizzes([self.quiz.id])
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer", password="Secret123"))
+
+        ids = [quiz["id"] for quiz in client.get(reverse("api:api-quiz-list")).json()]
+        self.assertEqual(ids, [self.other.id])
+        self.assertEqual(client.get(reverse("api:api-quiz-detail", args=[self.quiz.id])).status_code, 404)
+        response = client.post(
+            reverse("api:api-quiz-submit"), {"quiz_id": self.quiz.id, "answers": correct_answers(self.quiz)}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_reports_progress_and_finishes_hidden_quizzes(self):
+        out = io.StringIO()
+        call_command("delete_quizzes", self.quiz.id, "--chunk-size", "4", stdout=out)
+        self.assertIn(f"Quiz {self.quiz.id}: 8 user answers deleted", out.getvalue())
+        self.assert_only_other_quiz_remains()
+
+        hide_quizzes([self.other.id])
+        call_command("delete_quizzes", "--hidden", stdout=io.StringIO())
+        self.assertFalse(Quiz.all_objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command("delete_quizzes", self.quiz.id, stdout=io.StringIO())
+
+    @override_settings(QUIZ_DELETION_MODE="sync")
+    def test_admin_deletes_through_the_chunked_path(self):
+        self.client.force_login(User.objects.create_superuser(username="admin", password="Secret123"))
+        url = reverse("admin:quiz_quiz_changelist")
+        data = {"action": "delete_selected", "_selected_action": [self.quiz.id]}
+
+        with CaptureQueriesContext(connection) as queries:
+            confirmation = self.client.post(url, data)
+        self.assertContains(confirmation, "Are you sure")
+        self.assertFalse([q for q in queries.captured_queries if "quiz_useranswer" in q["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {**data, "post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assert_only_other_quiz_remains()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            detail = self.client.post(reverse("admin:quiz_quiz_delete", args=[self.other.id]), {"post": "yes"})
+        self.assertEqual(detail.status_code, 302)
+        self.assertFalse(Quiz.all_objects.exists())
+
+    def test_admin_only_hides_the_quiz_and_a_worker_deletes_it(self):
+        self.client.force_login(User.objects.create_superuser(username="admin", password="Secret123"))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(
+                reverse("admin:quiz_quiz_delete", args=[self.quiz.id]), {"post": "yes"}, follow=True,
+            )
+
+        self.assertEqual(callbacks, [])
+        self.assertContains(response, "being deleted in the background")
+        self.assertTrue(Quiz.all_objects.get(pk=self.quiz.id).is_hidden)
+        self.assertTrue(UserAnswer.objects.filter(submission__quiz=self.quiz).exists())
+
+        with mock.patch("quiz.management.commands.delete_quizzes.time.sleep", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("delete_quizzes", "--watch", stdout=io.StringIO())
+        self.assert_only_other_quiz_remains()
+
+
+class AdminQuizDeletionTransactionTests(TransactionTestCase):
+    @override_settings(QUIZ_DELETION_MODE="sync")
+    def test_chunks_run_after_the_admin_transaction_commits(self):
+        quiz = make_quiz(3)
+        self.client.force_login(User.objects.create_superuser(username="admin", password="Secret123"))
+        seen = []
+
+        def spy(model, lookup, quiz_id, chunk_size):
+            seen.append((connection.in_atomic_block, Quiz.all_objects.get(pk=quiz_id).is_hidden))
+            return delete_chunk(model, lookup, quiz_id, chunk_size)
+
+        with mock.patch("quiz.deletion.delete_chunk", side_effect=spy):
+            response = self.client.post(reverse("admin:quiz_quiz_delete", args=[quiz.id]), {"post": "yes"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(seen)
+        self.assertEqual(set(seen), {(False, True)})
+        self.assertFalse(Quiz.all_objects.exists())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_dir.cleanup)
+        settings_override = self.settings(LEADERBOARD_SNAPSHOT_DIR=self.snapshot_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        leaderboard._boards.clear()
+
+        self.quiz = make_quiz(3)
+        self.users = [User.objects.create_user(username=f"user{i}", password="Secret123") for i in range(4)]
+        for user, score in zip(self.users, [1, 3, 2, 3]):
+            UserSubmission.objects.create(quiz=self.quiz, user_name=user, score=score)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = reverse("api:api-quiz-leaderboard", args=[self.quiz.id])
+
+    def test_top_and_my_rank(self):
+        response = self.client.get(self.url, {"limit": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 4)
+        self.assertEqual([e["user_name"] for e in response.data["top"]], ["user1", "user3"])
+        self.assertEqual(response.data["me"]["rank"], 4)
+
+    def test_graded_submission_updates_board(self):
+        self.client.get(self.url)
+        newcomer = User.objects.create_user(username="newcomer", password="Secret123")
+        with self.captureOnCommitCallbacks(execute=True):
+            save_submission(self.quiz, newcomer, 5, [])
+
+        board = leaderboard._boards.get(self.quiz.id)
+        self.assertEqual(board.rank_of(newcomer.id)["rank"], 1)
+        self.assertEqual(board.watermark, UserSubmission.objects.exclude(user_name=newcomer).latest("id").id)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["top"][0]["user_name"], "newcomer")
+        self.assertEqual(response.data["total"], 5)
+
+    def test_late_commit_below_the_watermark_is_caught_up(self):
+        late, *committed = UserSubmission.objects.filter(quiz=self.quiz).order_by("id")
+        board = leaderboard.Leaderboard(self.quiz.id)
+        board.add_rows(
+            UserSubmission.objects.filter(id__in=[s.id for s in committed]).values_list(*leaderboard.ENTRY_FIELDS)
+        )
+        board.watermark = committed[-1].id
+
+        with self.assertNumQueries(2):
+            board.catch_up()
+        self.assertEqual(len(board), 4)
+        self.assertEqual(board.rank_of(late.user_name_id)["submission_id"], late.id)
+        with self.assertNumQueries(1):
+            board.catch_up()
+
+    def test_deleted_submission_drops_board(self):
+        self.client.get(self.url)
+        UserSubmission.objects.get(user_name=self.users[1]).delete()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["total"], 3)
+        self.assertEqual(response.data["top"][0]["user_name"], "user3")
+
+    def test_rebuild_command_writes_snapshot_used_on_cold_start(self):
+        call_command("rebuild_leaderboards", self.quiz.id, stdout=io.StringIO())
+        leaderboard._boards.clear()
+
+        with self.assertNumQueries(2):
+            board = leaderboard.get_leaderboard(self.quiz.id)
+        self.assertEqual(len(board), 4)
+
+    def test_missing_quiz(self):
+        response = self.client.get(reverse("api:api-quiz-leaderboard", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="student", password="Secret123"))
+        make_quiz(2)
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse("api:api-quiz-list"))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+        metrics = self.client.get("/metrics")
+        self.assertEqual(metrics.status_code, 200)
+        body = metrics.content.decode()
+        self.assertIn('quiz_http_requests_total{view="api:api-quiz-list",method="GET",status="200"}', body)
+        self.assertIn('quiz_http_request_db_queries_bucket{view="api:api-quiz-list",method="GET",le="+Inf"}', body)
+
+    def test_metrics_forbidden_from_other_hosts(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.8")
+        self.assertEqual(response.status_code, 403)
+
+    def test_slow_requests_are_logged(self):
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0):
+            middleware = RequestMetricsMiddleware(lambda request: self.client.get(reverse("api:api-quiz-list")))
+        request = RequestFactory().get("/api/quizzes/")
+        request.resolver_match = None
+        with self.assertLogs("quiz.middleware", level="WARNING") as logs:
+            middleware(request)
+        self.assertIn("queries", logs.output[0])
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_connections_are_tuned(self):
+        if connection.vendor != "sqlite" or "init_command" not in connection.settings_dict["OPTIONS"]:
+            self.skipTest("Only applies to the tuned SQLite profile.")
+        with connection.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            }
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000})
+
+    def test_the_sample_database_keeps_its_journal(self):
+        if connection.vendor != "sqlite" or not settings.QUIZ_SQLITE_WAL:
+            self.skipTest("Only applies to the tuned SQLite profile.")
+        with tempfile.TemporaryDirectory() as directory:
+            sample = type(connections["default"])(dict(connection.settings_dict, NAME=f"{directory}/db.sqlite3"), "sample")
+            with override_settings(QUIZ_SQLITE_WAL_EXCLUDE=[sample.settings_dict["NAME"]]):
+                with sample.cursor() as cursor:
+                    mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+            sample.close()
+        self.assertEqual(mode, "delete")
+
+
+class BenchmarkBudgetTests(TestCase):
+    def test_hot_paths_stay_within_query_budgets(self):
+        for row in run_benchmarks(sizes=(10, 100), repeat=1):
+            with self.subTest(endpoint=row["endpoint"], questions=row["questions"]):
+                self.assertLessEqual(row["queries"], row["query_budget"])
@@ -1,11 +1,12 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from .views import *
 from .api import (
     QuizViewSet, EventViewSet, UserSubmissionViewSet, UserAnswerViewSet, 
-    QuizSubmissionApi, RegisterViewSet, QuizCreateApi, QuestionCreateApi, 
-    AnswerCreateApi, EventCreateApi
+    QuizSubmissionApi, QuizSubmissionStatusApi, RegisterViewSet, QuizCreateApi, QuestionCreateApi, 
+    AnswerCreateApi, EventCreateApi, QuizBulkCreateApi, SubmissionExportApi
 )
+from . import async_api
 
 urlpatterns = [
     path('', index, name='home'),
@@ -16,6 +17,7 @@ urlpatterns = [
     path('quiz/<int:pk>/', QuizDetail.as_view(), name='quiz_detail'),
     path('result/<int:submission_id>/', quiz_result, name='quiz_result'),
     path('events/', event, name='events'),
+    path('events.ics', event_calendar, name='events_ical'),
 ]
 
 router = DefaultRouter()
@@ -27,10 +29,16 @@ router.register(r'user-answers', UserAnswerViewSet, basename='api-useranswer')
 
 api_urlpatterns = [
     path('quiz/submit/', QuizSubmissionApi.as_view(), name='api-quiz-submit'),
+    path('quiz/submit/<int:ticket_id>/', QuizSubmissionStatusApi.as_view(), name='api-quiz-submission-status'),
     path('quiz/create/', QuizCreateApi.as_view(), name='api-quiz-create'),
+    path('quiz/bulk-create/', QuizBulkCreateApi.as_view(), name='api-quiz-bulk-create'),
     path('question/create/', QuestionCreateApi.as_view(), name='api-question-create'),
     path('answer/create/', AnswerCreateApi.as_view(), name='api-answer-create'),
     path('event/create/', EventCreateApi.as_view(), name='api-event-create'),
+    re_path(r'^export/submissions\.(?P<fmt>csv|ndjson)$', SubmissionExportApi.as_view(), name='api-submission-export'),
+    path('async/quiz/submit/', async_api.submit_quiz, name='api-async-quiz-submit'),
+    path('async/quizzes/', async_api.quiz_list, name='api-async-quiz-list'),
+    path('async/quizzes/<int:pk>/', async_api.quiz_detail, name='api-async-quiz-detail'),
     path('', include(router.urls)),
 ]
 
@@ -1,16 +1,20 @@
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
 from django import forms
-from django.db.models import Count
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views import View
 from django.views.generic import ListView, FormView
 
-from .models import Quiz, UserAnswer, Answer, UserSubmission, Event
+from .accounts import DuplicateAccount, create_account
+from .content import list_version
+from .grading import DuplicateSubmission, InvalidSubmission, get_answer_key, grade_submission, save_submission
+from .ical import CONTENT_TYPE, calendar_lines, event_range
+from .models import Quiz, UserSubmission, Event
+from .serializers import EventRangeQuerySerializer, error_paths
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from .forms import RegisterForm, LoginForm
@@ -46,15 +50,12 @@ class RegisterView(View):
                 form.add_error("email", "Email is required.")
                 return render(request, self.template_name, {"form": form})
 
-            if User.objects.filter(username__iexact=username).exists():
-                form.add_error("username", "A user with this username already exists.")
+            try:
+                create_account(username, email, password)
+            except DuplicateAccount as exc:
+                form.add_error(exc.field, exc.message)
                 return render(request, self.template_name, {"form": form})
 
-            if User.objects.filter(email__iexact=email).exists():
-                form.add_error("email", "A user with this email already exists.")
-                return render(request, self.template_name, {"form": form})
-
-            User.objects.create_user(username=username, email=email, password=password)
             messages.success(request, "Account created successfully")
             return redirect("login")
         return render(request, self.template_name, {"form": form})
@@ -87,16 +88,25 @@ class QuizList(ListView, LoginRequiredMixin):
     login_url = '/login/'
 
     def get_queryset(self):
-        return Quiz.objects.annotate(num_questions=Count('questions')).filter(num_questions__gt=0)
+        return Quiz.objects.filter(question_count__gt=0)
+
+    def get_context_data(self, **kwargs):
+        # The quiz grid is cached per version, so the queryset above is only
+        # evaluated when the fragment has to be rendered again.
+        context = super().get_context_data(**kwargs)
+        context['quiz_list_version'] = list_version(Quiz.objects.all())
+        return context
 
 
 class QuizForm(forms.Form):
+    """Fields come from the quiz's cached answer key, so building the form runs no queries."""
+
     def __init__(self, *args, **kwargs):
-        quiz = kwargs.pop('quiz')
+        answer_key = kwargs.pop('answer_key')
         super().__init__(*args, **kwargs)
-        for question in quiz.questions.all():
+        for question in answer_key.questions:
             if question.question_type == 'MCQ':
-                choices = [(answer.id, answer.text) for answer in question.answers.all()]
+                choices = answer_key.choices.get(question.id, ())
                 self.fields[f'question_{question.id}'] = forms.ChoiceField(
                     label=question.text,
                     choices=choices,
@@ -106,6 +116,7 @@ class QuizForm(forms.Form):
             elif question.question_type == 'TEXT':
                 self.fields[f'question_{question.id}'] = forms.CharField(
                     label=question.text,
+                    max_length=1000,
                     widget=forms.TextInput(attrs={'class': 'border p-2 w-full'}),
                     required=True
                 )
@@ -119,11 +130,15 @@ class QuizDetail(LoginRequiredMixin, FormView):
     def dispatch(self, request, *args, **kwargs):
         self.quiz = get_object_or_404(Quiz, pk=kwargs['pk'])
 
-        if UserSubmission.objects.filter(quiz=self.quiz, user_name=request.user).exists():
+        # Submits go through grade_submission -> save_submission like the API
+        # and rely on its unique constraint; the lookup here only spares users
+        # from filling in a form they can no longer submit.
+        if request.method == "GET" and UserSubmission.objects.filter(quiz=self.quiz, user_name=request.user).exists():
             messages.warning(request, "You have already completed this quiz.")
             return redirect("quiz_list")
 
-        if not self.quiz.questions.exists():
+        self.answer_key = get_answer_key(self.quiz)
+        if not self.answer_key.questions:
             messages.error(request, "This quiz has no questions available.")
             return redirect("quiz_list")
 
@@ -131,120 +146,37 @@ class QuizDetail(LoginRequiredMixin, FormView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['quiz'] = self.quiz
+        kwargs['answer_key'] = self.answer_key
         return kwargs
 
-    def form_valid(self, form):
-        user = self.request.user
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('quiz', self.quiz)
+        return super().get_context_data(**kwargs)
 
-        if UserSubmission.objects.filter(quiz=self.quiz, user_name=user).exists():
+    def form_valid(self, form):
+        # Fields are named after their questions; grade them as the API grades its payload.
+        answers = {
+            str(question.id): form.cleaned_data.get(f"question_{question.id}")
+            for question in self.answer_key.questions
+        }
+        try:
+            graded = grade_submission(self.quiz, answers)
+        except InvalidSubmission as exc:
+            form.add_error(None, exc.detail)
+            return self.form_invalid(form)
+
+        try:
+            submission = save_submission(self.quiz, self.request.user, graded.score, graded.user_answers)
+        except DuplicateSubmission:
             messages.warning(self.request, "You have already completed this quiz.")
             return redirect("quiz_list")
-
-        if not self.quiz.questions.exists():
-            messages.error(self.request, "This quiz has no questions available.")
-            return redirect("quiz_list")
-
-        submission = UserSubmission.objects.create(
-            quiz=self.quiz,
-            user_name=user,
-            score=0
-        )
-        score = 0
-
-        for question in self.quiz.questions.all():
-            field = f"question_{question.id}"
-            user_value = form.cleaned_data.get(field)
-
-            if question.question_type == "MCQ":
-                if user_value is None:
-                    messages.error(self.request, f"Please answer question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                user_value = str(user_value).strip() if user_value else ""
-
-                if user_value == '':
-                    messages.error(self.request, f"Please answer question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                try:
-                    answer_id = int(user_value)
-                except (ValueError, TypeError):
-                    messages.error(self.request, f"Invalid answer format for question: {question.text[:50]}. Expected a numeric answer ID.")
-                    submission.delete()  # Clean up incomplete submission
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                if answer_id <= 0:
-                    messages.error(self.request, f"Answer ID must be a positive integer for question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                try:
-                    selected_answer = Answer.objects.get(id=answer_id)
-                except Answer.DoesNotExist:
-                    messages.error(self.request,
-                                   f"Selected answer does not exist for question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                if selected_answer.question != question:
-                    messages.error(self.request, f"Invalid answer selected. Answer does not belong to question: {question.text[:50]}...")
-                    submission.delete()  # Clean up incomplete submission
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                correct = selected_answer.is_correct
-
-                if correct:
-                    score += 1
-                UserAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    answer=selected_answer,
-                    is_correct=correct,
-                )
-            else:
-                if not user_value:
-                    messages.error(self.request, f"Please provide an answer for: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                user_value = user_value.strip() if isinstance(user_value, str) else str(user_value)
-
-                if user_value == '':
-                    messages.error(self.request, f"Please provide an answer for: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                if len(user_value) > 1000:
-                    messages.error(self.request, f"Text answer is too long. Maximum 1000 characters allowed for question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                if len(user_value) < 1:
-                    messages.error(self.request, f"Text answer cannot be empty for question: {question.text[:50]}...")
-                    submission.delete()
-                    return redirect("quiz_detail", pk=self.quiz.id)
-
-                placeholder_answer = question.answers.first()
-
-                UserAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    answer=placeholder_answer,
-                    is_correct=False,
-                )
-
-        submission.score = score
-        submission.save()
         return redirect("quiz_result", submission_id=submission.id)
 
 
 @login_required(login_url='/login/')
 def quiz_result(request, submission_id):
     submission = get_object_or_404(UserSubmission, id=submission_id)
-    if submission.user_name != request.user:
+    if submission.user_name_id != request.user.id:
         messages.error(request, "You do not have permission to view this quiz result.")
         return redirect("quiz_list")
 
@@ -252,11 +184,27 @@ def quiz_result(request, submission_id):
 
 
 def event(request):
+    today = timezone.now().date()
+    # Left lazy: the template's cached fragment evaluates it once, and not at all on a hit.
     upcoming_event = Event.objects.filter(
-        date__gte=timezone.now().date()
-    ).order_by('date')
+        date__gte=today
+    ).order_by('date', 'id')
 
     context = {
-        'events': upcoming_event
+        'events': upcoming_event,
+        'events_version': (today, *list_version(Event.objects.all())),
     }
     return render(request, 'event.html', context)
+
+
+def event_calendar(request):
+    """All events (``?from=``/``?to=`` dates, inclusive) as a streamed iCalendar feed."""
+    params = EventRangeQuerySerializer(data=request.GET)
+    if not params.is_valid():
+        return HttpResponseBadRequest(
+            '\n'.join(f"{error['path']}: {error['message']}" for error in error_paths(params.errors))
+        )
+    events = event_range(params.validated_data.get('from'), params.validated_data.get('to'))
+    response = StreamingHttpResponse(calendar_lines(events, request.get_host()), content_type=CONTENT_TYPE)
+    response['Content-Disposition'] = 'inline; filename="events.ics"'
+    return response